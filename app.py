@@ -56,6 +56,15 @@ def initialize_session_state():
     if "profile_result" not in st.session_state:
         st.session_state["profile_result"] = None
     
+    if "cleaned_profile" not in st.session_state:
+        st.session_state["cleaned_profile"] = None
+
+    if "cleaning_plan" not in st.session_state:
+        st.session_state["cleaning_plan"] = None
+
+    if "report_job" not in st.session_state:
+        st.session_state["report_job"] = None
+    
     # Chat history for AI agent
     if "chat_history" not in st.session_state:
         st.session_state["chat_history"] = []
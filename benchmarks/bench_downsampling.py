@@ -0,0 +1,54 @@
+# benchmarks/bench_downsampling.py
+#
+# LTTB and min-max downsampling of long series to chart width, and the
+# plain line plot they replace (timed only up to --plot-max points).
+# Usage: python benchmarks/bench_downsampling.py [sizes...]
+
+import os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from src.tools.downsampling import lttb, minmax_buckets, LINE_MAX_POINTS
+
+PLOT_MAX_POINTS = 10_000_000
+
+
+def make_series(n: int, seed: int = 0) -> np.ndarray:
+    """Random walk with spikes, as float32 (sensor-like)."""
+    rng = np.random.default_rng(seed)
+    y = rng.standard_normal(n, dtype="float32")
+    np.cumsum(y, out=y)
+    y[rng.integers(0, n, size=max(1, n // 1_000_000))] += 1_000
+    return y
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def render(y: np.ndarray, x: np.ndarray = None) -> float:
+    fig, ax = plt.subplots(figsize=(8, 4))
+    start = time.perf_counter()
+    ax.plot(np.arange(len(y)) if x is None else x, y)
+    fig.savefig(os.devnull, format="png")
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000, 100_000_000]
+
+    print(f"{'points':>12} {'lttb':>8} {'minmax':>8} {'plot reduced':>13} {'plot all':>9}")
+    for n in sizes:
+        y = make_series(n)
+        lttb_time, picks = timed(lambda: lttb(y, LINE_MAX_POINTS))
+        minmax_time, _ = timed(lambda: minmax_buckets(y, LINE_MAX_POINTS))
+        reduced = render(y[picks], picks)
+        full = f"{render(y):.2f}s" if n <= PLOT_MAX_POINTS else "skipped"
+        print(f"{n:>12,} {lttb_time:>7.2f}s {minmax_time:>7.2f}s {reduced:>12.2f}s {full:>9}")
+        del y
@@ -0,0 +1,48 @@
+# benchmarks/bench_load.py
+#
+# Plain pd.read_csv vs. the streaming loader: rows/sec, peak and resident memory.
+# Usage: python benchmarks/bench_load.py [csv_path | rows] [chunksize]
+# Without a path, a synthetic CSV of the given size is written to a temp file.
+
+import os, sys, tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+from src.tools.utils import benchmark_load, CHUNK_SIZE
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "age": rng.integers(18, 90, size=rows),
+        "score": rng.normal(70, 10, size=rows).round(2),
+        "amount": rng.exponential(100, size=rows).round(2).astype(str),
+        "region": rng.choice(["north", "south", "east", "west"], size=rows),
+        "segment": rng.choice([f"seg_{i}" for i in range(50)], size=rows),
+    })
+    df.loc[rng.random(size=rows) < 0.05, "score"] = np.nan
+    df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else "1000000"
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_SIZE
+
+    if os.path.exists(arg):
+        path, cleanup = arg, False
+    else:
+        path, cleanup = os.path.join(tempfile.mkdtemp(), "bench_load.csv"), True
+        write_synthetic_csv(path, int(arg))
+
+    try:
+        print(f"File: {path} ({os.path.getsize(path) / 1024 / 1024:.0f} MB)")
+        stats = benchmark_load(path, chunksize=chunksize)
+        print(stats[["rows", "seconds", "rows_per_sec", "memory_mb", "peak_memory_mb"]].round(2).to_string())
+        base, streaming = stats.loc["read_csv"], stats.loc["streaming"]
+        print(f"resident memory: {base['memory_mb'] / streaming['memory_mb']:.1f}x smaller, "
+              f"peak: {base['peak_memory_mb'] / streaming['peak_memory_mb']:.1f}x smaller")
+    finally:
+        if cleanup:
+            os.remove(path)
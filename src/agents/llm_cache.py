@@ -0,0 +1,207 @@
+# src/agents/llm_cache.py
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from langchain_core.messages import AIMessage
+
+from src.agents.llm_client import get_llm, llm_settings
+
+# Responses are kept in a local SQLite file keyed by (model, params, prompt, dataset)
+LLM_CACHE_PATH = "src/data/cache/llm_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("EDA_LLM_CACHE_TTL_HOURS", "168")) * 3600
+LLM_CACHE_MAX_BYTES = int(os.getenv("EDA_LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+_STATS = {"exact_hits": 0, "normalized_hits": 0, "misses": 0, "seconds_saved": 0.0}
+_STATS_LOCK = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    exact_key TEXT PRIMARY KEY,
+    normalized_key TEXT NOT NULL,
+    response TEXT NOT NULL,
+    latency REAL NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_normalized ON responses (normalized_key);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing punctuation folded, so trivially different wordings match."""
+    return re.sub(r"\s+", " ", prompt).strip().lower().rstrip("?!. ")
+
+
+def cache_keys(prompt: str, settings: dict, fingerprint: str = None):
+    """(exact, normalized) keys of a prompt under the given model settings and dataset."""
+    def key(text):
+        spec = {"settings": settings, "data": fingerprint, "prompt": text}
+        return hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return key(prompt), key(normalize_prompt(prompt))
+
+
+def _count(name: str, seconds: float = 0.0):
+    with _STATS_LOCK:
+        _STATS[name] += 1
+        _STATS["seconds_saved"] += seconds
+
+
+class LLMCache:
+    """
+    SQLite-backed response store. Lookups try the exact prompt first, then
+    its normalized form; entries expire after ttl seconds and the least
+    recently used are evicted once the stored responses exceed max_bytes.
+    Each call opens its own connection, so report threads can share it.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, exact_key: str, normalized_key: str):
+        """(response, original latency, kind) of a live entry, or None."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                for kind, column, key in (("exact", "exact_key", exact_key),
+                                          ("normalized", "normalized_key", normalized_key)):
+                    row = conn.execute(
+                        f"SELECT exact_key, response, latency FROM responses "
+                        f"WHERE {column} = ? AND created >= ? ORDER BY last_used DESC LIMIT 1",
+                        (key, now - self.ttl),
+                    ).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE responses SET last_used = ? WHERE exact_key = ?", (now, row[0]))
+                        return row[1], row[2], kind
+        finally:
+            conn.close()
+        return None
+
+    def put(self, exact_key: str, normalized_key: str, response: str, latency: float):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (exact_key, normalized_key, response, latency, len(response.encode()), now, now),
+                )
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in conn.execute("SELECT exact_key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE exact_key = ?", stale)
+
+    def entries(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        finally:
+            conn.close()
+
+
+class CachedLLM:
+    """
+    Drop-in for get_llm() in callers that only use invoke(prompt).content.
+    The real client is created on the first miss, so cached answers need
+    no API key or network. fingerprint ties entries to one dataset.
+    """
+
+    def __init__(self, fingerprint: str = None, cache: LLMCache = None, factory=get_llm):
+        self.fingerprint = fingerprint
+        self.cache = cache
+        self.factory = factory
+        self.settings = llm_settings()
+        self._llm = None
+
+    def _get_cache(self):
+        if self.cache is None:
+            self.cache = _get_shared_cache()
+        return self.cache
+
+    def invoke(self, prompt: str) -> AIMessage:
+        exact_key, normalized_key = cache_keys(prompt, self.settings, self.fingerprint)
+        try:
+            cache = self._get_cache()
+            cached = cache.get(exact_key, normalized_key)
+        except (sqlite3.Error, OSError):
+            # A broken or unwritable cache file must never break the chat
+            cache = cached = None
+        if cached is not None:
+            response, latency, kind = cached
+            _count(f"{kind}_hits", latency)
+            return AIMessage(content=response)
+
+        _count("misses")
+        if self._llm is None:
+            self._llm = self.factory()
+        start = time.perf_counter()
+        message = self._llm.invoke(prompt)
+        latency = time.perf_counter() - start
+
+        content = message.content if hasattr(message, "content") else str(message)
+        if cache is not None:
+            try:
+                cache.put(exact_key, normalized_key, content, latency)
+            except (sqlite3.Error, OSError):
+                pass
+        return AIMessage(content=content)
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _get_shared_cache() -> LLMCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = LLMCache()
+    return _CACHE
+
+
+def get_cached_llm(fingerprint: str = None) -> CachedLLM:
+    """LLM client with the shared response cache, scoped to a dataset fingerprint."""
+    return CachedLLM(fingerprint)
+
+
+def llm_cache_stats() -> dict:
+    """Exact / normalized hits, misses and LLM seconds saved in this process."""
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    lookups = stats["exact_hits"] + stats["normalized_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["exact_hits"] + stats["normalized_hits"]) / lookups if lookups else 0.0
+    return stats
@@ -6,6 +6,21 @@ from langchain_openai import ChatOpenAI
 
 load_dotenv()  # load .env config
 
+LLM_MODEL = "meta-llama/llama-3-8b-instruct"
+LLM_TEMPERATURE = 0.2
+LLM_MAX_TOKENS = 300
+
+
+def llm_settings() -> dict:
+    """Model and generation parameters of get_llm (part of the LLM cache key)."""
+    return {
+        "model": LLM_MODEL,
+        "temperature": LLM_TEMPERATURE,
+        "max_tokens": LLM_MAX_TOKENS,
+        "base_url": os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+    }
+
+
 def get_llm():
     api_key = os.getenv("OPENROUTER_API_KEY")
     base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
@@ -14,9 +29,9 @@ def get_llm():
         raise ValueError("Missing OPENROUTER_API_KEY in .env")
 
     return ChatOpenAI(
-        model="meta-llama/llama-3-8b-instruct",
-        temperature=0.2,
-        max_tokens=300,
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS,
         api_key=api_key,
         base_url=base_url
     )
@@ -6,12 +6,18 @@ import re
 from typing import List, Tuple
 import pandas as pd
 
+from src.pipeline.correlation import numeric_columns
+
 # --- Detect Intent ---
 def detect_intent(user_input: str) -> str:
     text = user_input.lower()
 
+    if any(x in text for x in ["outlier", "anomal"]):
+        return "outliers"
     if any(x in text for x in ["describe", "summary", "overview"]):
         return "describe"
+    if "correlat" in text and not any(x in text for x in ["heatmap", "plot", "chart", "graph", "visual"]):
+        return "correlation"
     if "column" in text or "columns" in text:
         return "columns"
     if "missing" in text or "null" in text:
@@ -27,9 +33,10 @@ def detect_intent(user_input: str) -> str:
 
 # --- Smart chart type inference ---
 def infer_best_chart(df, user_text: str) -> Tuple[List[str], str]:
-    numeric_cols = df.select_dtypes(include=["int", "float"]).columns.tolist()
-    cat_cols = df.select_dtypes(include=["object"]).columns.tolist()
-    date_cols = df.select_dtypes(include=["datetime", "datetime64[ns]"]).columns.tolist()
+    # Any width and text dtype: the loader emits int8/float32 and category columns
+    numeric_cols = numeric_columns(df)
+    cat_cols = df.select_dtypes(include=["object", "category", "string"]).columns.tolist()
+    date_cols = [col for col, dtype in df.dtypes.items() if pd.api.types.is_datetime64_any_dtype(dtype)]
 
     # Trend intent
     if "trend" in user_text or "time" in user_text:
@@ -0,0 +1,188 @@
+# src/agents/prompt_builder.py
+
+import os
+import math
+import pandas as pd
+
+from src.pipeline.profile_cache import cached_profile_dataset
+
+# Token budgets of the dataset summary sent with report and chat prompts
+# (llama-3-8b has an 8k context and answers in up to 300 tokens)
+REPORT_PROMPT_TOKENS = int(os.getenv("EDA_REPORT_PROMPT_TOKENS", "1500"))
+CHAT_PROMPT_TOKENS = int(os.getenv("EDA_CHAT_PROMPT_TOKENS", "600"))
+# tiktoken encoding used for estimates when installed; chars / 4 otherwise
+TOKENIZER_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+STAT_DIGITS = 3
+
+_ENCODER = None
+_ENCODER_LOADED = False
+
+
+def _get_encoder():
+    """tiktoken encoder, loaded once; None when unavailable (not installed or offline)."""
+    global _ENCODER, _ENCODER_LOADED
+    if not _ENCODER_LOADED:
+        _ENCODER_LOADED = True
+        try:
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception:
+            _ENCODER = None
+    return _ENCODER
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of text: tiktoken when available, else about 4 characters per token."""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _fmt(value) -> str:
+    if value is None or pd.isna(value):
+        return "n/a"
+    return f"{float(value):.{STAT_DIGITS}g}"
+
+
+def _numeric_notes(row: dict):
+    """(score, flags) of a numeric column from its profile statistics."""
+    score, flags = 0.0, []
+    std, mean, median = row.get("std"), row.get("mean"), row.get("50%")
+    if pd.isna(std) or std == 0:
+        return 1.0, ["constant"]
+
+    if median is not None and not pd.isna(median):
+        skew = abs(mean - median) / std
+        score += min(skew, 1.0)
+        if skew > 0.2:
+            flags.append("skewed")
+
+    q1, q3 = row.get("25%"), row.get("75%")
+    if q1 is not None and q3 is not None and q3 > q1:
+        tail = max(row["max"] - q3, q1 - row["min"]) / (q3 - q1)
+        score += 0.25 * math.log1p(max(tail, 0.0))
+        if tail > 3:
+            flags.append("outliers")
+    return score, flags
+
+
+def _categorical_notes(row: dict, present: int, dtype):
+    """(score, flags) of a non-numeric column from its sketch summary."""
+    score, flags = 0.0, []
+    distinct = row.get("Distinct (approx)", 0)
+    share = row.get("Top Count", 0) / present if present else 0.0
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        # Unique timestamps are expected, not a sign of an ID column
+        pass
+    elif present and distinct >= 0.9 * present:
+        score += 0.5
+        flags.append("id-like")
+    elif share >= 0.9:
+        score += 0.5
+        flags.append("dominant value")
+    return score, flags
+
+
+def rank_columns(profile: dict, n_rows: int) -> list:
+    """
+    Scores every column by how much it is worth telling the LLM about:
+    missing values, constant or skewed distributions, far outliers, ID-like
+    or single-valued categories. Returns (column, score, line) tuples,
+    most interesting first; line is the compact one-line summary.
+    """
+    missing = profile["missing_values"]
+    types = profile["column_types"]["Type"]
+    # Plain dicts: per-column .loc lookups dominate on very wide profiles
+    stats = profile["stats"].to_dict("index")
+    categorical = profile["categorical"].to_dict("index")
+    missing_pct = dict(zip(missing.index, missing["Percentage"].tolist()))
+    missing_count = dict(zip(missing.index, missing["Missing Count"].tolist()))
+
+    ranked = []
+    for col, dtype in types.items():
+        pct = float(missing_pct[col])
+        present = n_rows - int(missing_count[col])
+        parts = [f"{col} ({dtype})"]
+        if pct:
+            parts.append(f"missing {pct:.1f}%")
+
+        if present <= 0:
+            # Nothing to describe beyond the missing share
+            score, flags = 0.0, []
+        elif col in stats:
+            row = stats[col]
+            score, flags = _numeric_notes(row)
+            parts.append(
+                f"mean {_fmt(row.get('mean'))}, std {_fmt(row.get('std'))}, "
+                f"min {_fmt(row.get('min'))}, median {_fmt(row.get('50%'))}, max {_fmt(row.get('max'))}"
+            )
+        elif col in categorical:
+            row = categorical[col]
+            score, flags = _categorical_notes(row, present, dtype)
+            parts.append(f"~{int(row['Distinct (approx)'])} distinct")
+            share = row.get("Top Count", 0) / present if present else 0.0
+            if row.get("Top Value") is not None and share >= 0.01:
+                parts.append(f"top '{str(row['Top Value'])[:30]}' {share:.0%}")
+        else:
+            score, flags = 0.0, []
+
+        score += 2 * pct / 100
+        details = ", ".join(parts[1:] + flags)
+        ranked.append((col, score, f"{parts[0]}: {details}" if details else parts[0]))
+
+    ranked.sort(key=lambda item: -item[1])
+    return ranked
+
+
+def dataset_summary(df: pd.DataFrame, profile: dict = None, budget: int = REPORT_PROMPT_TOKENS) -> str:
+    """
+    Compact text summary of a dataset for LLM prompts, built from its
+    (cached) profile: shape and overall missingness, then one line per
+    column, most interesting first, until the token budget is spent.
+    """
+    if profile is None:
+        profile = cached_profile_dataset(df)
+    n_rows, n_cols = df.shape
+
+    missing = profile["missing_values"]["Missing Count"]
+    cells = n_rows * n_cols
+    lines = [
+        f"Dataset: {n_rows:,} rows x {n_cols:,} columns "
+        f"({len(profile['stats'])} numeric, {n_cols - len(profile['stats'])} other).",
+        f"Missing: {missing.sum() / cells:.1%} of cells, in {int((missing > 0).sum())} of {n_cols:,} columns."
+        if cells else "Missing: none.",
+        "Columns (most notable first):",
+    ]
+    used = sum(estimate_tokens(line) + 1 for line in lines)
+
+    ranked = rank_columns(profile, n_rows)
+    shown = 0
+    for _, _, line in ranked:
+        # Leave room for the closing "omitted" line
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget - 16:
+            break
+        lines.append(f"- {line}")
+        used += cost
+        shown += 1
+
+    if shown < len(ranked):
+        lines.append(f"... {len(ranked) - shown} more columns omitted (less notable).")
+    return "\n".join(lines)
+
+
+def build_report_prompt(df: pd.DataFrame, profile: dict = None, budget: int = REPORT_PROMPT_TOKENS) -> str:
+    """Prompt asking for report insights, with a token-budgeted dataset summary."""
+    header = "Provide 4-6 key insights about this dataset:\n"
+    return header + dataset_summary(df, profile, budget - estimate_tokens(header))
+
+
+def build_chat_prompt(user_input: str, df: pd.DataFrame, profile: dict = None,
+                      budget: int = CHAT_PROMPT_TOKENS) -> str:
+    """Chat fallback prompt: the user's message with a small dataset summary for context."""
+    header = "You are an EDA assistant. Respond briefly.\n"
+    question = f"\nUser: {user_input}"
+    summary = dataset_summary(df, profile, budget - estimate_tokens(header + question))
+    return f"{header}{summary}{question}"
@@ -1,12 +1,40 @@
 # src/agents/response_generator.py
 
 import streamlit as st
-from src.agents.llm_client import get_llm
+from src.agents.llm_cache import get_cached_llm
+from src.agents.prompt_builder import build_chat_prompt
 from src.agents.nlp_intent_parser import detect_intent, parse_chart_request
 from src.tools.chart_generator import generate_chart
+from src.pipeline.correlation import get_top_correlations
+from src.pipeline.outliers import detect_outliers
+from src.tools.utils import dataframe_fingerprint
 import pandas as pd
 
 
+def session_profile(df):
+    """
+    Returns the session profile of the cleaned dataset (kept up to date
+    incrementally after cleaning) when it describes df, so consumers can
+    reuse its summaries instead of recounting.
+    """
+    if df is not None and df is st.session_state.get("cleaned_dataset"):
+        return st.session_state.get("cleaned_profile")
+    return None
+
+
+def session_data_key(df):
+    """
+    Cleaning-plan version key of df when df is the session's cleaned
+    dataset, so cached charts and reports follow undo / redo; None
+    otherwise (callers then hash the full content).
+    """
+    plan = st.session_state.get("cleaning_plan")
+    if plan is not None and df is not None and df is st.session_state.get("cleaned_dataset") \
+            and df is plan.materialize():
+        return plan.version_key()
+    return None
+
+
 def handle_user_query(user_input: str):
     df = st.session_state.get("cleaned_dataset")
 
@@ -15,6 +43,8 @@ def handle_user_query(user_input: str):
 
     intent = detect_intent(user_input)
     df_columns = df.columns.tolist()
+    profile = session_profile(df)
+    data_key = session_data_key(df)
 
     # --- Intent: Describe Dataset ---
     if intent == "describe":
@@ -33,16 +63,45 @@ def handle_user_query(user_input: str):
 
     # --- Intent: Missing Values ---
     if intent == "missing":
-        missing = df.isnull().sum()
+        if profile is not None:
+            missing = profile["missing_values"]["Missing Count"]
+        else:
+            missing = df.isnull().sum()
         msg = "Missing values per column:\n" + missing.to_string()
         return (msg, None)
 
     # --- Intent: Stats ---
     if intent == "stats":
-        stats = df.describe().transpose()
+        if profile is not None:
+            stats = profile["stats"]
+        else:
+            stats = df.describe().transpose()
         msg = "📊 Basic Statistics:\n\n" + stats.to_string()
         return (msg, None)
 
+    # --- Intent: Correlation ---
+    if intent == "correlation":
+        top = get_top_correlations(df, k=10, data_key=data_key)
+        if top.empty:
+            return ("Correlations need at least two numeric columns.", None)
+        lines = [
+            f"- **{row['Column A']}** & **{row['Column B']}**: {row['Correlation']:.3f}"
+            for _, row in top.iterrows()
+        ]
+        return ("🔗 Strongest correlations:\n" + "\n".join(lines), None)
+
+    # --- Intent: Outliers ---
+    if intent == "outliers":
+        result = detect_outliers(df, profile, top_n=5)
+        summary = result["summary"]
+        summary = summary[summary.sum(axis=1) > 0]
+        if summary.empty:
+            return ("✅ No outliers found in the numeric columns.", None)
+        msg = "🚨 Outliers per column (IQR / MAD / Z-score):\n" + summary.to_string()
+        if not result["top_rows"].empty:
+            msg += "\n\nMost extreme rows:\n" + result["top_rows"].to_string(index=False)
+        return (msg, None)
+
     # --- Intent: Chart ---
     if intent == "chart":
         detected_cols, chart_type = parse_chart_request(user_input, df_columns, df)
@@ -51,19 +110,20 @@ def handle_user_query(user_input: str):
             return ("Please mention a valid column name to visualize.", None)
 
         if len(detected_cols) == 1:
-            img = generate_chart(df, detected_cols[0], chart_type=chart_type)
+            img = generate_chart(df, detected_cols[0], chart_type=chart_type, profile=profile,
+                                 data_key=data_key)
             return (f"📈 Showing {chart_type} chart for **{detected_cols[0]}**", img)
 
         if len(detected_cols) >= 2:
-            img = generate_chart(df, detected_cols[0], detected_cols[1], chart_type="scatter")
+            img = generate_chart(df, detected_cols[0], detected_cols[1], chart_type="scatter",
+                                 data_key=data_key)
             return (f"📈 Scatter plot: **{detected_cols[0]} vs {detected_cols[1]}**", img)
 
     # --- Fallback: LLM handles unknown ---
-    llm = get_llm()
+    # Repeated questions on the same dataset are answered from the response cache
+    llm = get_cached_llm(dataframe_fingerprint(df))
     try:
-        ai_msg = llm.invoke(
-            f"You are an EDA assistant. Respond briefly.\nUser: {user_input}"
-        )
+        ai_msg = llm.invoke(build_chat_prompt(user_input, df, profile))
         response = ai_msg.content if hasattr(ai_msg, "content") else str(ai_msg)
     except:
         response = "I couldn't understand that — try asking about statistics or charts."
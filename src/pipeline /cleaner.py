@@ -1,17 +1,59 @@
 
 # src/pipeline/cleaner.py
 
+import os
+import sys
+import time
+import warnings
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
+from src.pipeline.profiler import column_quantile, column_top_values
+from src.tools.process_pool import get_process_pool, reset_process_pool
+from src.pipeline.correlation import numeric_columns
 
-def suggest_imputation(df: pd.DataFrame) -> dict:
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Strategies given as {"method": ..., "group_by": [...], "order_by": ...}
+GROUP_METHODS = ["Median by Group", "Mode by Group", "Forward Fill by Group"]
+
+# Model-based imputation (numeric columns): fit on a stratified sample,
+# fill the missing rows in chunks, one column per pool task
+MODEL_METHODS = ["KNN", "Iterative"]
+MODEL_FIT_SAMPLE = int(os.getenv("EDA_IMPUTE_FIT_SAMPLE", "50000"))
+# KNN compares every missing row with every donor, so it keeps fewer donors
+KNN_FIT_SAMPLE = int(os.getenv("EDA_IMPUTE_KNN_SAMPLE", "10000"))
+MODEL_STRATA = 10
+MODEL_MAX_FEATURES = 16
+MODEL_ROW_CHUNK = 2_000
+MODEL_WORKERS = int(os.getenv("EDA_IMPUTE_WORKERS", "1"))
+KNN_NEIGHBORS = 5
+ITERATIVE_MAX_ITER = 10
+
+
+def strategy_method(strategy) -> str:
+    """Method name of a strategy, given either as a name or as a group spec dict."""
+    return strategy["method"] if isinstance(strategy, dict) else strategy
+
+
+def suggest_imputation(df: pd.DataFrame, profile: dict = None) -> dict:
     """
     Suggests a default imputation strategy per column with missing values:
     - Numerical: median
     - Categorical: most frequent
+    Missing counts are read from the profile when given.
     """
+    if profile is not None:
+        missing = profile["missing_values"]["Missing Count"]
+    else:
+        missing = df.isnull().sum()
+
     suggestions = {}
     for col in df.columns:
-        if df[col].isnull().sum() > 0:
+        if missing.get(col, 0) > 0:
             if pd.api.types.is_numeric_dtype(df[col]):
                 suggestions[col] = "Median"
             else:
@@ -19,20 +61,320 @@ def suggest_imputation(df: pd.DataFrame) -> dict:
     return suggestions
 
 
-def apply_imputation(df: pd.DataFrame, strategies: dict) -> pd.DataFrame:
+def _profile_fill_value(profile: dict, col: str, method: str):
+    """Fill value answered from the profile's cached statistics, or None."""
+    if profile is None:
+        return None
+    if method == "Median":
+        value = column_quantile(profile, col, 0.5)
+    elif method == "Mean":
+        stats = profile["stats"]
+        value = stats.loc[col, "mean"] if "mean" in stats.columns and col in stats.index else None
+    else:
+        top = column_top_values(profile, col, 1)
+        value = top.index[0] if top is not None and len(top) else None
+    return None if value is None or pd.isna(value) else value
+
+
+def compile_imputation_plan(df: pd.DataFrame, strategies: dict, profile: dict = None) -> dict:
     """
-    Applies selected imputation strategies per column.
+    Compiles per-column strategies into one plan:
+    - fill: column -> fill value, taken from the profile where it already
+      holds the statistic, otherwise computed in one vectorized pass per
+      statistic (median / mean / mode) over all columns that need it;
+    - drop: columns whose missing rows are removed with a single mask;
+    - groups: (method, group keys, order column) -> columns, so columns
+      sharing a grouping are filled in one groupby pass;
+    - models: KNN / Iterative -> numeric columns filled by a fitted model.
+    Global fill values are computed over the uncleaned columns.
     """
-    df_clean = df.copy()
+    fill = {}
+    drop = []
+    groups = {}
+    models = {}
+    pending = {"Median": [], "Mean": [], "Most Frequent": []}
 
-    for col, method in strategies.items():
-        if method == "Median":
-            df_clean[col].fillna(df_clean[col].median(), inplace=True)
-        elif method == "Mean":
-            df_clean[col].fillna(df_clean[col].mean(), inplace=True)
-        elif method == "Most Frequent":
-            df_clean[col].fillna(df_clean[col].mode()[0], inplace=True)
+    for col, strategy in strategies.items():
+        method = strategy_method(strategy)
+        if method in GROUP_METHODS:
+            group_by = strategy["group_by"]
+            keys = tuple([group_by] if isinstance(group_by, str) else group_by)
+            groups.setdefault((method, keys, strategy.get("order_by")), []).append(col)
+        elif method in MODEL_METHODS:
+            models.setdefault(method, []).append(col)
         elif method == "Drop":
-            df_clean.dropna(subset=[col], inplace=True)
+            drop.append(col)
+        elif method in pending:
+            value = _profile_fill_value(profile, col, method)
+            if value is None:
+                pending[method].append(col)
+            else:
+                fill[col] = value
+
+    if pending["Median"]:
+        fill.update(df[pending["Median"]].median().to_dict())
+    if pending["Mean"]:
+        fill.update(df[pending["Mean"]].mean().to_dict())
+    if pending["Most Frequent"]:
+        modes = df[pending["Most Frequent"]].mode(dropna=True)
+        if not modes.empty:
+            fill.update(modes.iloc[0].to_dict())
+
+    fill = {col: value for col, value in fill.items() if not pd.isna(value)}
+    return {"fill": fill, "drop": drop, "groups": groups, "models": models}
+
+
+def _group_fill_values(df: pd.DataFrame, method: str, keys: list, columns: list, order_by: str = None) -> pd.DataFrame:
+    """
+    Per-row fill values for one grouping, in a single vectorized pass:
+    - Median by Group: groupby().transform("median")
+    - Mode by Group: (key, value) counts, the most frequent value per key
+      mapped back to the rows
+    - Forward Fill by Group: groupby().ffill() with rows ordered by order_by
+    """
+    grouped_kwargs = {"observed": True, "sort": False}
+    if method == "Median by Group":
+        return df.groupby(keys, **grouped_kwargs)[columns].transform("median")
+
+    if method == "Mode by Group":
+        if len(keys) > 1:
+            row_keys = pd.MultiIndex.from_frame(df[keys])
+        else:
+            row_keys = pd.Index(df[keys[0]])
+        values = {}
+        for col in columns:
+            counts = df.groupby(keys + [col], **grouped_kwargs).size().reset_index(name="_count")
+            modes = counts.sort_values("_count", ascending=False, kind="stable").drop_duplicates(keys)
+            values[col] = modes.set_index(keys)[col].reindex(row_keys).to_numpy()
+        return pd.DataFrame(values, index=df.index)
+
+    # Forward fill within each group, in time order when an order column is given
+    if order_by is None:
+        return df.groupby(keys, **grouped_kwargs)[columns].ffill()
+    # Positions in order_by order; pandas sorts text with gaps, missing values last
+    order = df[order_by].reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy()
+    ordered = df.iloc[order]
+    filled = ordered.groupby(keys, **grouped_kwargs)[columns].ffill()
+    return filled.iloc[np.argsort(order, kind="stable")].set_axis(df.index)
+
+
+def _stratified_sample(values: np.ndarray, n: int, strata: int = MODEL_STRATA, seed: int = 0) -> np.ndarray:
+    """
+    Positions of up to n non-null rows, drawn proportionally from quantile
+    bins of values so the sample keeps the column's distribution (tails
+    included). Fully vectorized: rows are ranked by a random key within
+    their bin and each bin keeps its quota.
+    """
+    rows = np.flatnonzero(~np.isnan(values))
+    if len(rows) <= n:
+        return rows
+    present = values[rows]
+    edges = np.quantile(present, np.linspace(0, 1, strata + 1)[1:-1])
+    bins = np.searchsorted(edges, present, side="right")
+
+    quota = np.ceil(np.bincount(bins, minlength=strata) * n / len(rows)).astype("int64")
+    order = np.lexsort((np.random.default_rng(seed).random(len(rows)), bins))
+    sorted_bins = bins[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_bins, sorted_bins)
+    return np.sort(rows[order[rank < quota[sorted_bins]]])
+
+
+def _make_model(method: str):
+    from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+    from sklearn.impute import IterativeImputer, KNNImputer
+
+    if method == "KNN":
+        return KNNImputer(n_neighbors=KNN_NEIGHBORS, keep_empty_features=True)
+    return IterativeImputer(max_iter=ITERATIVE_MAX_ITER, random_state=0, keep_empty_features=True)
+
+
+def _peak_rss_mb():
+    """
+    Lifetime high-water resident memory of the calling process, not of one
+    column's work (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _missing_chunks(df: pd.DataFrame, missing: np.ndarray, positions: np.ndarray):
+    """Missing rows of the model columns, MODEL_ROW_CHUNK rows at a time."""
+    for chunk_start in range(0, len(missing), MODEL_ROW_CHUNK):
+        rows = missing[chunk_start:chunk_start + MODEL_ROW_CHUNK]
+        yield df.iloc[rows, positions].to_numpy(dtype="float64", na_value=np.nan, copy=True)
 
+
+def _array_chunks(values: np.ndarray):
+    for chunk_start in range(0, len(values), MODEL_ROW_CHUNK):
+        yield values[chunk_start:chunk_start + MODEL_ROW_CHUNK]
+
+
+def _model_impute_column(method: str, fit_values: np.ndarray, missing_values, n_missing: int):
+    """
+    Fits one imputer on the sample (target in column 0, features after it)
+    and fills the missing rows chunk by chunk. missing_values is either an
+    iterator of row chunks (serial runs slice them from the frame) or one
+    array, as pool workers only take and return arrays.
+    """
+    start = time.perf_counter()
+    if method == "KNN":
+        # Donors with missing features look artificially close under nan-euclidean distance
+        complete = ~np.isnan(fit_values).any(axis=1)
+        if complete.sum() >= KNN_NEIGHBORS:
+            fit_values = fit_values[complete]
+    model = _make_model(method)
+    if isinstance(missing_values, np.ndarray):
+        missing_values = _array_chunks(missing_values)
+    filled = np.empty(n_missing)
+    with warnings.catch_warnings():
+        # Early-stopping notices from IterativeImputer on noisy columns
+        warnings.simplefilter("ignore")
+        model.fit(fit_values)
+        chunk_start = 0
+        for chunk in missing_values:
+            filled[chunk_start:chunk_start + len(chunk)] = model.transform(chunk)[:, 0]
+            chunk_start += len(chunk)
+    return filled, time.perf_counter() - start, _peak_rss_mb()
+
+
+def _model_task(df: pd.DataFrame, method: str, col: str, numeric: list):
+    """Missing rows, sample size, fit array and column positions for one column's model."""
+    target = df[col].to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.flatnonzero(np.isnan(target))
+    sample = _stratified_sample(target, KNN_FIT_SAMPLE if method == "KNN" else MODEL_FIT_SAMPLE)
+
+    # Features: the numeric columns most correlated with the target on the sample
+    features = [c for c in numeric if c != col]
+    if len(features) > MODEL_MAX_FEATURES:
+        fit_frame = df.iloc[sample][[col] + features].astype("float64")
+        strength = fit_frame[features].corrwith(fit_frame[col]).abs().fillna(0)
+        features = strength.nlargest(MODEL_MAX_FEATURES).index.tolist()
+
+    positions = df.columns.get_indexer([col] + features)
+    # copy=True: under copy-on-write the array may be a read-only view, and imputers fill in place
+    fit_values = df.iloc[sample, positions].to_numpy(dtype="float64", na_value=np.nan, copy=True)
+    return missing, len(sample), fit_values, positions
+
+
+def _apply_models(df_clean: pd.DataFrame, models: dict, workers: int = MODEL_WORKERS,
+                  metrics: list = None) -> pd.DataFrame:
+    """
+    Fills the columns assigned to KNN / Iterative imputation, one column per
+    task, across a process pool when workers > 1. Serial runs slice the
+    missing rows from the frame one chunk at a time; pool tasks receive
+    them as one array. Appends wall time and the running process's peak
+    RSS per column to metrics, when given (see model_imputation_metrics).
+    """
+    numeric = numeric_columns(df_clean)
+    jobs = []
+    for method, columns in models.items():
+        for col in columns:
+            if col not in numeric:
+                raise ValueError(f"{method} imputation needs a numeric column: {col}")
+            missing, fit_rows, fit_values, positions = _model_task(df_clean, method, col, numeric)
+            if len(missing) and fit_rows:
+                jobs.append((method, col, missing, fit_rows, fit_values, positions))
+
+    results = None
+    if workers > 1 and len(jobs) > 1:
+        pool = get_process_pool("impute", workers)
+        try:
+            futures = [
+                pool.submit(_model_impute_column, method, fit_values,
+                            df_clean.iloc[missing, positions].to_numpy(dtype="float64", na_value=np.nan, copy=True),
+                            len(missing))
+                for method, _, missing, _, fit_values, positions in jobs
+            ]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); run serially, the next call respawns the pool
+            reset_process_pool("impute", workers, pool)
+    if results is None:
+        results = [
+            _model_impute_column(method, fit_values, _missing_chunks(df_clean, missing, positions), len(missing))
+            for method, _, missing, _, fit_values, positions in jobs
+        ]
+
+    for (method, col, missing, fit_rows, _, _), (filled, seconds, peak_rss) in zip(jobs, results):
+        values = df_clean[col].to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        values[missing] = filled
+        df_clean[col] = pd.Series(values, index=df_clean.index).astype(df_clean[col].dtype)
+        if metrics is None:
+            continue
+        metrics.append({
+            "Column": col,
+            "Method": method,
+            "Fit Rows": fit_rows,
+            "Rows Filled": len(missing),
+            "Seconds": round(seconds, 3),
+            "Process Peak RSS (MB)": None if peak_rss is None else round(peak_rss, 1),
+        })
     return df_clean
+
+
+def model_imputation_metrics(metrics: list) -> pd.DataFrame:
+    """
+    Table of the per-column metrics a KNN / Iterative run recorded (see
+    apply_imputation's metrics argument): wall time and process peak RSS.
+    Process peak RSS is the lifetime high-water mark of the process
+    that ran the column (a pool worker, or the app itself when running
+    serially), so it bounds the column's memory rather than measuring it.
+    """
+    return pd.DataFrame(metrics)
+
+
+def execute_imputation_plan(df: pd.DataFrame, plan: dict, metrics: list = None) -> pd.DataFrame:
+    """
+    Applies a compiled plan without copying the whole frame: rows are
+    dropped with one combined mask, then all fills run as one bulk
+    fillna. Group strategies then fill from one groupby pass per grouping,
+    computed over the rows left after drops; group-less gaps fall back to
+    the global median/mode, while forward fill leaves leading gaps missing.
+    KNN / Iterative columns are filled last, with the other fills in place;
+    their per-column metrics are appended to metrics when given.
+    Only the filled columns (and, when rows are dropped, the row subset) are
+    materialized; other columns share data with df.
+    """
+    df_clean = df
+    if plan["drop"]:
+        keep = df[plan["drop"]].notna().all(axis=1)
+        if not keep.all():
+            df_clean = df[keep]
+
+    if plan["fill"]:
+        df_clean = df_clean.fillna(plan["fill"])
+    elif df_clean is df:
+        df_clean = df.copy(deep=False)
+
+    for (method, keys, order_by), columns in plan.get("groups", {}).items():
+        values = _group_fill_values(df_clean, method, list(keys), columns, order_by)
+        for col in columns:
+            filled = df_clean[col].fillna(values[col])
+            # Groups without any value (or with a missing key) fall back to the global statistic
+            if method == "Median by Group" and filled.isna().any():
+                filled = filled.fillna(filled.median())
+            elif method == "Mode by Group" and filled.isna().any():
+                modes = filled.mode(dropna=True)
+                if len(modes):
+                    filled = filled.fillna(modes.iloc[0])
+            df_clean[col] = filled
+
+    if plan.get("models"):
+        df_clean = _apply_models(df_clean, plan["models"], metrics=metrics)
+
+    return df_clean
+
+
+def apply_imputation(df: pd.DataFrame, strategies: dict, profile: dict = None,
+                     metrics: list = None) -> pd.DataFrame:
+    """
+    Applies selected imputation strategies per column.
+    When the profile of df is given, medians, means and modes come from its
+    cached statistics and sketches instead of re-scanning the columns.
+    Pass a list as metrics to collect per-column KNN / Iterative metrics;
+    it belongs to the caller, so concurrent sessions never share it.
+    """
+    plan = compile_imputation_plan(df, strategies, profile)
+    return execute_imputation_plan(df, plan, metrics)
@@ -0,0 +1,194 @@
+# src/pipeline/cleaning_plan.py
+
+import os
+import glob
+import json
+import time
+import uuid
+import hashlib
+import pandas as pd
+
+from src.tools.utils import dataframe_fingerprint, atomic_write
+from src.pipeline.cleaner import apply_imputation, strategy_method
+from src.pipeline.profiler import update_profile
+
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_KEEP = int(os.getenv("EDA_CHECKPOINT_KEEP", 5))  # newest checkpoints kept per dataset
+
+
+def _changed_columns(strategies: dict) -> list:
+    return [col for col, strategy in strategies.items() if strategy_method(strategy) != "Drop"]
+
+
+class CleaningPlan:
+    """
+    Lazy cleaning pipeline over a raw frame: a recorded list of operations
+    (each a JSON-serializable strategies dict for apply_imputation) plus a
+    cursor.
+    Undo/redo only move the cursor; the cleaned frame is built on demand by
+    replaying the active operations and memoized for the current version.
+    Columns no operation fills are shared with the raw frame, not copied.
+    """
+
+    def __init__(self, raw: pd.DataFrame, profile: dict = None):
+        self.raw = raw
+        self.profile = profile
+        self.fingerprint = dataframe_fingerprint(raw)
+        self.operations = []
+        self.cursor = 0
+        self._frame = None
+        self._frame_profile = None
+        self._frame_operations = None
+        # KNN / Iterative metrics of the last operation replayed
+        self.model_metrics = []
+        # Each plan saves to its own checkpoint file, so sessions over the same
+        # data never overwrite each other's steps
+        self.checkpoint_id = uuid.uuid4().hex
+
+    @property
+    def active_operations(self) -> list:
+        return self.operations[:self.cursor]
+
+    def version_key(self) -> str:
+        """
+        Identity of the current cleaned frame: the raw fingerprint plus a hash
+        of the active operations. Keys exports and reports of the frame, where
+        the sampled fingerprint of the cleaned frame could miss what changed.
+        """
+        operations = json.dumps(self.active_operations, sort_keys=True, default=str)
+        digest = hashlib.blake2b(operations.encode(), digest_size=8).hexdigest()
+        return f"{self.fingerprint}-{digest}"
+
+    def apply(self, strategies: dict):
+        """Records a cleaning step; any undone steps after the cursor are discarded."""
+        del self.operations[self.cursor:]
+        self.operations.append({"strategies": dict(strategies)})
+        self.cursor += 1
+
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        return self.cursor < len(self.operations)
+
+    def undo(self):
+        if self.can_undo():
+            self.cursor -= 1
+
+    def redo(self):
+        if self.can_redo():
+            self.cursor += 1
+
+    def _built_prefix(self) -> int:
+        """How many active operations the memoized frame was built from, or -1 if it is stale."""
+        built, active = self._frame_operations, self.active_operations
+        if built is None or len(built) > len(active) or any(done is not op for done, op in zip(built, active)):
+            return -1
+        return len(built)
+
+    def _replay(self):
+        """
+        Rebuilds the frame for the active operations. When the memoized frame
+        was built from a prefix of them (the usual case after apply or redo),
+        only the remaining operations run; otherwise replay starts from raw.
+        """
+        start = self._built_prefix()
+        if start < 0:
+            frame, profile, start = self.raw, self.profile, 0
+        else:
+            frame, profile = self._frame, self._frame_profile
+
+        active = self.active_operations
+        for operation in active[start:]:
+            strategies = operation["strategies"]
+            metrics = []
+            cleaned = apply_imputation(frame, strategies, profile, metrics)
+            self.model_metrics = metrics
+            if profile is not None:
+                profile = update_profile(profile, frame, cleaned, _changed_columns(strategies))
+            frame = cleaned
+        self._frame, self._frame_profile = frame, profile
+        self._frame_operations = list(active)
+
+    def materialize(self) -> pd.DataFrame:
+        """The cleaned frame for the current cursor (the raw frame when nothing is applied)."""
+        if self._built_prefix() != self.cursor:
+            self._replay()
+        return self._frame
+
+    def materialize_profile(self) -> dict:
+        """Profile of the materialized frame, updated incrementally from the raw profile."""
+        self.materialize()
+        return self._frame_profile
+
+    def to_dict(self) -> dict:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "fingerprint": self.fingerprint,
+            "operations": self.operations,
+            "cursor": self.cursor,
+            "saved_at": time.time(),
+        }
+
+    def save_checkpoint(self, directory: str = CHECKPOINT_DIR) -> str:
+        """Writes the plan (not the data) to <directory>/<fingerprint>-<checkpoint_id>.json."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.fingerprint}-{self.checkpoint_id}.json")
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2, default=str)
+
+        atomic_write(path, write)
+        self._prune_checkpoints(directory)
+        return path
+
+    def _prune_checkpoints(self, directory: str):
+        """Keeps the CHECKPOINT_KEEP newest checkpoints of this dataset, always including this plan's own."""
+        pattern = os.path.join(glob.escape(directory), f"{self.fingerprint}-*.json")
+        paths = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+        for path in paths[max(CHECKPOINT_KEEP, 1):]:
+            if path.endswith(f"-{self.checkpoint_id}.json"):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def find_checkpoint(raw: pd.DataFrame, directory: str = CHECKPOINT_DIR, exclude: str = None):
+        """
+        Path of the newest checkpoint saved for this raw frame, matched by
+        fingerprint, or None. exclude skips a plan's own checkpoint_id.
+        """
+        pattern = os.path.join(glob.escape(directory), f"{dataframe_fingerprint(raw)}-*.json")
+        paths = [path for path in glob.glob(pattern)
+                 if exclude is None or not path.endswith(f"-{exclude}.json")]
+        if not paths:
+            return None
+        return max(paths, key=os.path.getmtime)
+
+    @classmethod
+    def load_checkpoint(cls, raw: pd.DataFrame, profile: dict = None, path: str = None,
+                        directory: str = CHECKPOINT_DIR):
+        """
+        Restores a saved plan for this raw frame: the checkpoint at path, or the
+        newest one for its fingerprint. The restored plan gets a fresh
+        checkpoint_id, so saving it never overwrites the file it came from.
+        Returns None when no compatible checkpoint exists.
+        """
+        plan = cls(raw, profile)
+        path = path or cls.find_checkpoint(raw, directory)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("version") != CHECKPOINT_VERSION or saved.get("fingerprint") != plan.fingerprint:
+            return None
+
+        plan.operations = saved["operations"]
+        plan.cursor = min(int(saved["cursor"]), len(plan.operations))
+        return plan
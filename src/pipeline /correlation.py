@@ -0,0 +1,215 @@
+# src/pipeline/correlation.py
+
+import hashlib
+import warnings
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from src.tools.utils import content_fingerprint
+
+# Column blocks are sized so one block stays within the memory budget
+CORR_BLOCK_SIZE = 256
+CORR_BLOCK_BUDGET_BYTES = 256 * 1024 * 1024
+CORR_ROW_CHUNK = 65_536
+CORR_CACHE_ENTRIES = 16
+HEATMAP_MAX_COLUMNS = 25
+
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    """Numeric, non-boolean columns: the ones correlations are defined for."""
+    # Read from df.dtypes: indexing every column costs seconds on very wide frames
+    return [
+        col for col, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+
+
+def _column_blocks(df: pd.DataFrame, columns: list) -> list:
+    per_column = max(len(df), 1) * 8
+    size = int(max(1, min(CORR_BLOCK_SIZE, CORR_BLOCK_BUDGET_BYTES // per_column)))
+    return [columns[i:i + size] for i in range(0, len(columns), size)]
+
+
+def _block_values(df: pd.DataFrame, columns: list, method: str) -> np.ndarray:
+    """A column block as float64, ranked for Spearman and centred for stability."""
+    block = df[columns]
+    if method == "spearman":
+        block = block.rank()
+    values = block.to_numpy(dtype="float64", na_value=np.nan)
+    if len(values):
+        with warnings.catch_warnings():
+            # All-null columns have no mean; they stay NaN and yield NaN r
+            warnings.simplefilter("ignore", RuntimeWarning)
+            values = values - np.nanmean(values, axis=0)
+    return values
+
+
+def _pairwise_block(x: np.ndarray, y: np.ndarray, min_periods: int):
+    """
+    Pairwise-complete Pearson r between every column of x and of y.
+    Uses masked sums accumulated over row chunks, so each pair only uses
+    the rows where both columns are present (like DataFrame.corr).
+    Returns (r, observations).
+    """
+    shape = (x.shape[1], y.shape[1])
+    n = np.zeros(shape)
+    sx = np.zeros(shape)
+    sy = np.zeros(shape)
+    sxx = np.zeros(shape)
+    syy = np.zeros(shape)
+    sxy = np.zeros(shape)
+
+    for start in range(0, len(x), CORR_ROW_CHUNK):
+        xc = x[start:start + CORR_ROW_CHUNK]
+        yc = y[start:start + CORR_ROW_CHUNK]
+        mx = ~np.isnan(xc)
+        my = ~np.isnan(yc)
+        x0 = np.where(mx, xc, 0.0)
+        y0 = np.where(my, yc, 0.0)
+        mx = mx.astype("float64")
+        my = my.astype("float64")
+
+        n += mx.T @ my
+        sx += x0.T @ my
+        sy += mx.T @ y0
+        sxx += np.square(x0).T @ my
+        syy += mx.T @ np.square(y0)
+        sxy += x0.T @ y0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        r = cov / np.sqrt(var_x * var_y)
+
+    r = np.clip(r, -1.0, 1.0)
+    r[(n < max(min_periods, 2)) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    return r, n
+
+
+def compute_correlation_matrix(df: pd.DataFrame, method: str = "pearson", min_periods: int = 1) -> pd.DataFrame:
+    """
+    Pearson or Spearman correlation of all numeric columns, computed
+    block-wise with vectorized NumPy and pairwise handling of missing values.
+    Non-numeric columns are ignored. Spearman ranks each column over all of
+    its values, so with missing data it can differ slightly from pandas,
+    which re-ranks every pair over the rows both columns share.
+    """
+    columns = numeric_columns(df)
+    corr = np.full((len(columns), len(columns)), np.nan)
+    blocks = _column_blocks(df, columns)
+    offsets = np.cumsum([0] + [len(block) for block in blocks])
+
+    for i, block_a in enumerate(blocks):
+        x = _block_values(df, block_a, method)
+        for j in range(i, len(blocks)):
+            y = x if j == i else _block_values(df, blocks[j], method)
+            r, _ = _pairwise_block(x, y, min_periods)
+            corr[offsets[i]:offsets[i + 1], offsets[j]:offsets[j + 1]] = r
+            corr[offsets[j]:offsets[j + 1], offsets[i]:offsets[i + 1]] = r.T
+
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def compute_top_correlations(df: pd.DataFrame, k: int = 10, method: str = "pearson",
+                             min_periods: int = 1) -> pd.DataFrame:
+    """
+    The k most strongly correlated column pairs (by |r|), without holding
+    the full matrix: each block pair is reduced to its own top-k at once.
+    """
+    columns = numeric_columns(df)
+    blocks = _column_blocks(df, columns)
+    offsets = np.cumsum([0] + [len(block) for block in blocks])
+
+    best_r = np.empty(0)
+    best_a = np.empty(0, dtype="int64")
+    best_b = np.empty(0, dtype="int64")
+    best_n = np.empty(0)
+
+    for i, block_a in enumerate(blocks):
+        x = _block_values(df, block_a, method)
+        for j in range(i, len(blocks)):
+            y = x if j == i else _block_values(df, blocks[j], method)
+            r, n = _pairwise_block(x, y, min_periods)
+
+            rows, cols = np.nonzero(~np.isnan(r))
+            if i == j:
+                upper = rows < cols
+                rows, cols = rows[upper], cols[upper]
+
+            best_r = np.concatenate([best_r, r[rows, cols]])
+            best_a = np.concatenate([best_a, rows + offsets[i]])
+            best_b = np.concatenate([best_b, cols + offsets[j]])
+            best_n = np.concatenate([best_n, n[rows, cols]])
+            if len(best_r) > k:
+                keep = np.argpartition(-np.abs(best_r), k)[:k]
+                best_r, best_a, best_b, best_n = best_r[keep], best_a[keep], best_b[keep], best_n[keep]
+
+    order = np.argsort(-np.abs(best_r), kind="stable")
+    return pd.DataFrame({
+        "Column A": [columns[idx] for idx in best_a[order]],
+        "Column B": [columns[idx] for idx in best_b[order]],
+        "Correlation": best_r[order],
+        "Observations": best_n[order].astype("int64"),
+    })
+
+
+def _dataset_key(df: pd.DataFrame, data_key: str = None) -> str:
+    """
+    Cache identity of df: data_key (the cleaning plan's version key) or its
+    full content hash, plus its numeric columns, so column subsets of one
+    dataset version (heatmaps, report charts) get their own entries.
+    """
+    columns = hashlib.blake2b(repr([str(col) for col in numeric_columns(df)]).encode(), digest_size=8)
+    return f"{data_key or content_fingerprint(df)}-{columns.hexdigest()}"
+
+
+def _cached(key, compute):
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+    # Computed outside the lock: sessions on other datasets are not held up
+    result = compute()
+    with _CACHE_LOCK:
+        _CACHE[key] = result
+        while len(_CACHE) > CORR_CACHE_ENTRIES:
+            _CACHE.popitem(last=False)
+    return result
+
+
+def get_correlation_matrix(df: pd.DataFrame, method: str = "pearson", data_key: str = None) -> pd.DataFrame:
+    """
+    Correlation matrix cached per dataset version, shared by charts, reports
+    and chat. Pass the cleaning plan's version key as data_key; without it
+    the full content is hashed.
+    """
+    key = (_dataset_key(df, data_key), method, "matrix")
+    return _cached(key, lambda: compute_correlation_matrix(df, method))
+
+
+def get_top_correlations(df: pd.DataFrame, k: int = 10, method: str = "pearson",
+                         data_key: str = None) -> pd.DataFrame:
+    """Top-k correlated pairs cached per dataset version (see get_correlation_matrix)."""
+    key = (_dataset_key(df, data_key), method, "top", k)
+    return _cached(key, lambda: compute_top_correlations(df, k, method))
+
+
+def get_heatmap_matrix(df: pd.DataFrame, max_columns: int = HEATMAP_MAX_COLUMNS,
+                       data_key: str = None) -> pd.DataFrame:
+    """
+    Matrix for a readable heatmap. Wide tables are narrowed to the columns
+    taking part in the strongest pairs instead of computing the full matrix.
+    """
+    columns = numeric_columns(df)
+    if len(columns) <= max_columns:
+        return get_correlation_matrix(df, data_key=data_key)
+
+    top = get_top_correlations(df, k=max_columns, data_key=data_key)
+    selected = list(dict.fromkeys(top["Column A"].tolist() + top["Column B"].tolist()))[:max_columns]
+    return get_correlation_matrix(df[selected], data_key=data_key)
@@ -0,0 +1,130 @@
+# src/pipeline/outliers.py
+
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.pipeline.correlation import numeric_columns
+from src.pipeline.profiler import column_quantile
+
+OUTLIER_ROW_CHUNK = 250_000
+OUTLIER_COLUMN_BLOCK = 64
+# Thresholds are estimated on a row sample of large frames; scoring uses every row
+OUTLIER_STATS_SAMPLE = 200_000
+IQR_FACTOR = 1.5
+MAD_THRESHOLD = 3.5
+Z_THRESHOLD = 3.0
+# Scales MAD to the standard deviation of a normal distribution
+MAD_SCALE = 0.6745
+
+
+def column_thresholds(df: pd.DataFrame, profile: dict = None) -> pd.DataFrame:
+    """
+    Per-column statistics the detectors need: quartiles, median, MAD, mean
+    and std. Whatever the profile already knows (quartiles, mean, std) is
+    reused; the rest is computed one column block at a time, with all
+    quantiles of a block in a single NumPy call, over a uniform sample of
+    OUTLIER_STATS_SAMPLE rows on larger frames.
+    """
+    columns = numeric_columns(df)
+    stats = pd.DataFrame(np.nan, index=columns, columns=["q1", "median", "q3", "mad", "mean", "std"])
+    if not columns:
+        return stats
+
+    if profile is not None and not profile["stats"].empty:
+        known = profile["stats"].reindex(columns)
+        stats["mean"] = known["mean"].astype("float64")
+        stats["std"] = known["std"].astype("float64")
+        for label, q in [("q1", 0.25), ("median", 0.5), ("q3", 0.75)]:
+            stats[label] = [column_quantile(profile, col, q) for col in columns]
+        stats = stats.astype("float64")
+
+    sample = df if len(df) <= OUTLIER_STATS_SAMPLE else df.sample(n=OUTLIER_STATS_SAMPLE, random_state=0)
+
+    table = stats.to_numpy(copy=True)
+    with warnings.catch_warnings():
+        # All-null columns have no statistics; they stay NaN and are never flagged
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for start in range(0, len(columns), OUTLIER_COLUMN_BLOCK):
+            block = slice(start, start + OUTLIER_COLUMN_BLOCK)
+            values = sample[columns[block]].to_numpy(dtype="float64", na_value=np.nan)
+            known = table[block]
+
+            if np.isnan(known[:, [0, 1, 2]]).any():
+                known[:, [0, 1, 2]] = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0).T
+            if np.isnan(known[:, [4, 5]]).any():
+                known[:, 4] = np.nanmean(values, axis=0)
+                known[:, 5] = np.nanstd(values, axis=0, ddof=1)
+            known[:, 3] = np.nanmedian(np.abs(values - known[:, 1]), axis=0)
+
+    return pd.DataFrame(table, index=columns, columns=stats.columns)
+
+
+def detect_outliers(df: pd.DataFrame, profile: dict = None, top_n: int = 10) -> dict:
+    """
+    Scores every numeric column at once with three detectors:
+    - IQR: outside [Q1 - 1.5 IQR, Q3 + 1.5 IQR]
+    - MAD: robust z-score 0.6745 * |x - median| / MAD above 3.5
+    - Z-score: |x - mean| / std above 3
+    Rows are scored in chunks of OUTLIER_ROW_CHUNK with vectorized NumPy.
+    Returns:
+        - summary: outlier counts per column and detector
+        - top_rows: the rows with the highest robust z-score, with the
+          column responsible and its value
+    """
+    columns = numeric_columns(df)
+    summary = pd.DataFrame(0, index=columns, columns=["IQR", "MAD", "Z-Score"], dtype="int64")
+    empty_rows = pd.DataFrame(columns=["Row", "Column", "Value", "Robust Z"])
+    if not columns or df.empty:
+        return {"summary": summary, "top_rows": empty_rows}
+
+    stats = column_thresholds(df, profile)
+    iqr = (stats["q3"] - stats["q1"]).to_numpy()
+    low = stats["q1"].to_numpy() - IQR_FACTOR * iqr
+    high = stats["q3"].to_numpy() + IQR_FACTOR * iqr
+    median = stats["median"].to_numpy()
+    mean = stats["mean"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mad_scale = np.where(stats["mad"].to_numpy() > 0, MAD_SCALE / stats["mad"].to_numpy(), np.nan)
+        inv_std = np.where(stats["std"].to_numpy() > 0, 1.0 / stats["std"].to_numpy(), np.nan)
+
+    counts = np.zeros((3, len(columns)), dtype="int64")
+    best_score = np.empty(0)
+    best_row = np.empty(0, dtype="int64")
+    best_col = np.empty(0, dtype="int64")
+
+    for start in range(0, len(df), OUTLIER_ROW_CHUNK):
+        chunk = df.iloc[start:start + OUTLIER_ROW_CHUNK]
+        values = chunk[columns].to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            robust_z = np.abs(values - median) * mad_scale
+            z = np.abs(values - mean) * inv_std
+            counts[0] += ((values < low) | (values > high)).sum(axis=0)
+            counts[1] += (robust_z > MAD_THRESHOLD).sum(axis=0)
+            counts[2] += (z > Z_THRESHOLD).sum(axis=0)
+
+        # Row score: the worst robust z-score across columns
+        scored = np.where(np.isnan(robust_z), -np.inf, robust_z)
+        worst_col = scored.argmax(axis=1)
+        worst = scored[np.arange(len(scored)), worst_col]
+        flagged = np.nonzero(worst > MAD_THRESHOLD)[0]
+
+        best_score = np.concatenate([best_score, worst[flagged]])
+        best_row = np.concatenate([best_row, flagged + start])
+        best_col = np.concatenate([best_col, worst_col[flagged]])
+        if len(best_score) > top_n:
+            keep = np.argpartition(-best_score, top_n)[:top_n]
+            best_score, best_row, best_col = best_score[keep], best_row[keep], best_col[keep]
+
+    summary.loc[:, :] = counts.T
+
+    order = np.argsort(-best_score, kind="stable")
+    best_row, best_col = best_row[order], best_col[order]
+    top_rows = pd.DataFrame({
+        "Row": df.index[best_row],
+        "Column": [columns[c] for c in best_col],
+        "Value": [df[columns[c]].iloc[r] for r, c in zip(best_row, best_col)],
+        "Robust Z": best_score[order],
+    })
+
+    return {"summary": summary, "top_rows": top_rows}
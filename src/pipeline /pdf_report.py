@@ -1,27 +1,218 @@
 
 # src/pipeline/pdf_report.py
 
+import io
 import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+import math
+from reportlab import rl_config
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+    SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
 )
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 
-from src.pipeline.report_builder import generate_report_charts
+from src.tools.utils import content_fingerprint, atomic_write, store_cache_file, touch
+from src.pipeline.report_builder import generate_report_charts, embedded_size, REPORT_IMAGE_SIZE
+from src.pipeline.profile_cache import cached_profile_dataset
+
+# Finished reports are cached here under (dataset identity, insights, template)
+REPORT_CACHE_DIR = "exports/reports"
+REPORT_CACHE_MAX_BYTES = int(os.getenv("EDA_REPORT_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Bump when the report layout or charts change so older PDFs are not served
+REPORT_TEMPLATE_VERSION = 3
+
+logger = logging.getLogger(__name__)
+
+# Appendix tables: rows per table chunk (one page), fixed row height and
+# column widths (points, summing to the 515pt A4 frame) so nothing is measured
+APPENDIX_ROWS_PER_TABLE = 50
+APPENDIX_ROW_HEIGHT = 13
+APPENDIX_FONT_SIZE = 7
+COLUMN_TABLE_WIDTHS = [235, 120, 80, 80]
+STATS_TABLE_WIDTHS = [115] + [50] * 8
+
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+# rl_config is process-wide and report builds run on several threads: the
+# first build to start switches ASCII85 off, the last one to finish restores it
+_A85_LOCK = threading.Lock()
+_A85_STATE = {"builds": 0, "saved": None}
+
+
+@contextmanager
+def _binary_streams():
+    """Binary PDF streams during a build: ASCII85 text encoding only inflates every image by 25%."""
+    with _A85_LOCK:
+        if _A85_STATE["builds"] == 0:
+            _A85_STATE["saved"] = rl_config.useA85
+            rl_config.useA85 = 0
+        _A85_STATE["builds"] += 1
+    try:
+        yield
+    finally:
+        with _A85_LOCK:
+            _A85_STATE["builds"] -= 1
+            if _A85_STATE["builds"] == 0:
+                rl_config.useA85 = _A85_STATE["saved"]
+
+
+class _SectionDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate that tallies each page's content stream under the
+    report section it belongs to. A section starts at the flowable tagged
+    with _report_section; every section begins on a new page.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.section = "Other"
+        self.section_bytes = {}
+
+    def afterFlowable(self, flowable):
+        self.section = getattr(flowable, "_report_section", self.section)
+
+    def afterPage(self):
+        # The page's operators, sized as ReportLab will write them
+        stream = "\n".join(self.canv._code).encode("latin-1", "replace")
+        size = len(zlib.compress(stream)) if self.canv._pageCompression else len(stream)
+        self.section_bytes[self.section] = self.section_bytes.get(self.section, 0) + size
+
+
+def _section(flowable, name: str):
+    """Tags the first flowable of a report section for _SectionDocTemplate."""
+    flowable._report_section = name
+    return flowable
+
+
+def _clip(text, width: float) -> str:
+    """Cuts text to roughly what fits in width points at the appendix font size."""
+    text = str(text)
+    limit = max(4, int(width / (APPENDIX_FONT_SIZE * 0.55)))
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _format_number(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return f"{value:,.0f}" if float(value).is_integer() and abs(value) < 1e15 else f"{value:.4g}"
+
+
+def _table_chunks(header: list, rows: list, col_widths: list):
+    """
+    Splits plain-string rows into fixed-geometry Tables of
+    APPENDIX_ROWS_PER_TABLE rows, each repeating the header. With explicit
+    widths and heights ReportLab skips measuring every cell.
+    """
+    style = TableStyle([
+        ("FONT", (0, 0), (-1, -1), "Helvetica", APPENDIX_FONT_SIZE),
+        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold", APPENDIX_FONT_SIZE),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e2e8f0")),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.grey),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ])
+    for start in range(0, len(rows), APPENDIX_ROWS_PER_TABLE):
+        chunk = [header] + rows[start:start + APPENDIX_ROWS_PER_TABLE]
+        yield Table(chunk, colWidths=col_widths, rowHeights=APPENDIX_ROW_HEIGHT, style=style, hAlign="LEFT")
+
+
+def _appendix(profile: dict, styles) -> list:
+    """
+    Appendix flowables: column types with missing values, and numeric
+    statistics, one table chunk per page.
+    """
+    content = []
+    types = profile["column_types"]["Type"]
+    missing = profile["missing_values"]
+    rows = [
+        [_clip(col, COLUMN_TABLE_WIDTHS[0]), _clip(dtype, COLUMN_TABLE_WIDTHS[1]),
+         _format_number(count), f"{pct:.1f}%"]
+        for col, dtype, count, pct in zip(types.index, types.to_numpy(),
+                                          missing["Missing Count"].to_numpy(), missing["Percentage"].to_numpy())
+    ]
+    content.append(_section(Paragraph("📋 Appendix A: Column Types & Missing Values", styles['Heading2']), "Appendix"))
+    for table in _table_chunks(["Column", "Type", "Missing", "Missing %"], rows, COLUMN_TABLE_WIDTHS):
+        content.append(table)
+        content.append(PageBreak())
+
+    stats = profile["stats"]
+    if not stats.empty:
+        stats = stats.iloc[:, :len(STATS_TABLE_WIDTHS) - 1]
+        header = ["Column"] + [_clip(name, STATS_TABLE_WIDTHS[1]) for name in stats.columns]
+        rows = [
+            [_clip(col, STATS_TABLE_WIDTHS[0])] + [_format_number(value) for value in values]
+            for col, values in zip(stats.index, stats.to_numpy(dtype="float64").tolist())
+        ]
+        content.append(Paragraph("📐 Appendix B: Numeric Statistics", styles['Heading2']))
+        for table in _table_chunks(header, rows, STATS_TABLE_WIDTHS[:len(header)]):
+            content.append(table)
+            content.append(PageBreak())
+
+    return content
 
 
-def generate_pdf_report(df, ai_insights, output_path="EDA_Report.pdf"):
+def _size_breakdown(output_path: str, chart_images: list, captions: list, section_bytes: dict) -> list:
+    """
+    (section, bytes, note) rows for the finished PDF: each chart's embedded
+    image, the page content of each text section, then fonts and document
+    structure (whatever remains). Identical images are stored once by
+    ReportLab and counted once here.
+    """
+    rows = []
+    seen = set()
+    for i, png in enumerate(chart_images):
+        digest = hashlib.blake2b(png, digest_size=16).digest()
+        fmt = "jpeg" if png[:2] == b"\xff\xd8" else "png palette"
+        if digest in seen:
+            rows.append((f"Chart {i + 1}", 0, f"reuses an identical image ({captions[i]})"))
+            continue
+        seen.add(digest)
+        rows.append((f"Chart {i + 1}", embedded_size(png), f"{fmt} ({captions[i]})"))
+
+    for section, size in section_bytes.items():
+        rows.append((section, size, "page content"))
+    total = os.path.getsize(output_path)
+    rows.append(("Fonts & structure", max(total - sum(size for _, size, _ in rows), 0), "fonts, page and object tables"))
+    rows.append(("Total", total, f"{len(seen)} unique images"))
+    return rows
+
+
+def format_size_breakdown(rows: list) -> str:
+    """The breakdown rows as an aligned text table, one section per line."""
+    return "\n".join(f"  {section:<18} {size / 1024:>9.1f} KB  {note}" for section, size, note in rows)
+
+
+def generate_pdf_report(df, ai_insights, output_path="EDA_Report.pdf", profile=None, progress=None,
+                        data_key: str = None, breakdown: list = None):
     """
     Generates a clean multi-page EDA report with charts and AI text insights.
     Automatically wraps text properly to prevent overflow.
+    Ends with an appendix of per-column tables taken from the profile
+    (computed when not given).
+    progress, if given, is called as progress(stage, fraction_done) for the
+    "charts" and "pdf" stages; it may raise to abort the build.
+    data_key (the cleaning plan's version key) keys the cached correlations.
+    The size breakdown per section is logged and, when a list is passed as
+    breakdown, its (section, bytes, note) rows are appended to it.
     """
 
-    chart_paths, captions = generate_report_charts(df)
+    if profile is None:
+        profile = cached_profile_dataset(df)
+
+    if progress is not None:
+        progress("charts", 0.0)
+    chart_images, captions = generate_report_charts(df, profile, progress=progress, data_key=data_key)
 
-    pdf = SimpleDocTemplate(
+    pdf = _SectionDocTemplate(
         output_path,
         pagesize=A4,
         rightMargin=40,
@@ -47,7 +238,7 @@ def generate_pdf_report(df, ai_insights, output_path="EDA_Report.pdf"):
     content = []
 
     # Title Page
-    content.append(Paragraph("<b>📊 EDA Auto Report</b>", styles['Heading1']))
+    content.append(_section(Paragraph("<b>📊 EDA Auto Report</b>", styles['Heading1']), "Title page"))
     content.append(Spacer(1, 20))
     content.append(Paragraph(f"Dataset Rows: {df.shape[0]}", styles['Normal']))
     content.append(Paragraph(f"Dataset Columns: {df.shape[1]}", styles['Normal']))
@@ -58,7 +249,7 @@ def generate_pdf_report(df, ai_insights, output_path="EDA_Report.pdf"):
     content.append(PageBreak())
 
     # Insights Page
-    content.append(Paragraph("🧠 AI Insights & Summary", styles['Heading2']))
+    content.append(_section(Paragraph("🧠 AI Insights & Summary", styles['Heading2']), "Insights"))
     content.append(Spacer(1, 8))
     content.append(Paragraph("Here are insights based on the dataset:", styles['Normal']))
     content.append(Spacer(1, 12))
@@ -76,21 +267,124 @@ def generate_pdf_report(df, ai_insights, output_path="EDA_Report.pdf"):
     content.append(PageBreak())
 
     # Chart Pages
-    content.append(Paragraph("📈 Visual Analysis", styles['Heading2']))
+    content.append(_section(Paragraph("📈 Visual Analysis", styles['Heading2']), "Chart pages"))
     content.append(Spacer(1, 15))
 
-    for i, img_path in enumerate(chart_paths):
-        if os.path.exists(img_path):
-            content.append(Image(img_path, width=450, height=250))
+    # Charts arrive as budget-encoded PNG/JPEG bytes rendered at exactly this size
+    image_width, image_height = REPORT_IMAGE_SIZE
+    for i, png in enumerate(chart_images):
+        content.append(Image(io.BytesIO(png), width=image_width, height=image_height))
 
         content.append(Spacer(1, 10))
         content.append(Paragraph(captions[i], styles['Normal']))
         content.append(PageBreak())
 
-    pdf.build(content)
+    content.extend(_appendix(profile, styles))
+
+    if progress is not None:
+        progress("pdf", 0.0)
+        # Layout progress (flowables placed so far); lets a cancelled job stop mid-build
+        total = len(content)
+        pdf.setProgressCallBack(
+            lambda kind, value: progress("pdf", value / total) if kind == "PROGRESS" else None
+        )
+    with _binary_streams():
+        pdf.build(content)
+    if progress is not None:
+        progress("pdf", 1.0)
+
+    rows = _size_breakdown(output_path, chart_images, captions, pdf.section_bytes)
+    logger.info("Report size breakdown (%s):\n%s", output_path, format_size_breakdown(rows))
+    if breakdown is not None:
+        breakdown.extend(rows)
     return output_path
 
 
+def _insights_text(ai_insights) -> str:
+    return ai_insights if isinstance(ai_insights, str) else "\n".join(ai_insights)
+
+
+def report_cache_key(df, ai_insights, data_key: str = None) -> str:
+    """
+    Cache key of a report: dataset identity, insights hash and template
+    version. The dataset is identified by data_key (the cleaning plan's
+    raw fingerprint plus operations) or, without one, its full content hash.
+    """
+    insights_hash = hashlib.blake2b(_insights_text(ai_insights).encode(), digest_size=8).hexdigest()
+    return f"{data_key or content_fingerprint(df)}-{insights_hash}-v{REPORT_TEMPLATE_VERSION}"
+
+
+def _breakdown_path(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + ".json"
+
+
+def _write_json(path: str, value):
+    with open(path, "w") as f:
+        json.dump(value, f)
+
+
+def _drop_orphan_breakdowns(cache_dir: str):
+    """Removes saved breakdowns whose PDF the cache limit has evicted."""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(".json") and not os.path.exists(os.path.splitext(path)[0] + ".pdf"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def cached_pdf_report(df, ai_insights, profile=None, progress=None, cache_dir: str = REPORT_CACHE_DIR,
+                      data_key: str = None, breakdown: list = None):
+    """
+    generate_pdf_report with a content-addressed cache: an identical request
+    (same data, insights and template version) returns the stored PDF
+    without rendering anything. The profile only speeds up the build and is
+    not part of the key. The folder is kept under REPORT_CACHE_MAX_BYTES,
+    least recently used first.
+    The build's size breakdown is saved next to the PDF, so a list passed
+    as breakdown is filled on cache hits too.
+    Returns the PDF file path.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    file_path = os.path.join(cache_dir, f"report_{report_cache_key(df, ai_insights, data_key)}.pdf")
+    if os.path.exists(file_path):
+        touch(file_path)
+        _CACHE_STATS["hits"] += 1
+        if breakdown is not None:
+            try:
+                with open(_breakdown_path(file_path)) as f:
+                    breakdown.extend(tuple(row) for row in json.load(f))
+            except (OSError, ValueError):
+                pass
+        if progress is not None:
+            progress("pdf", 1.0)
+        return file_path
+
+    _CACHE_STATS["misses"] += 1
+    rows = []
+    store_cache_file(
+        file_path,
+        lambda tmp_path: generate_pdf_report(df, ai_insights, output_path=tmp_path, profile=profile,
+                                             progress=progress, data_key=data_key, breakdown=rows),
+        REPORT_CACHE_MAX_BYTES, suffix=".pdf",
+    )
+    try:
+        atomic_write(_breakdown_path(file_path), lambda tmp_path: _write_json(tmp_path, rows))
+        _drop_orphan_breakdowns(cache_dir)
+    except OSError:
+        pass
+    if breakdown is not None:
+        breakdown.extend(rows)
+    return file_path
+
+
+def report_cache_stats() -> dict:
+    """Hit/miss counters of the report cache in this process."""
+    total = _CACHE_STATS["hits"] + _CACHE_STATS["misses"]
+    return {**_CACHE_STATS, "hit_rate": _CACHE_STATS["hits"] / total if total else 0.0}
+
+
 
 # # src/pipeline/pdf_report.py
 
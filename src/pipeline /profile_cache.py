@@ -0,0 +1,125 @@
+# src/pipeline/profile_cache.py
+
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.pipeline.profiler import profile_dataset
+from src.tools.utils import dataframe_fingerprint, store_cache_file, touch
+
+PROFILE_CACHE_ENTRIES = 32
+PROFILE_CACHE_DIR = "src/data/cache/profiles"
+PROFILE_CACHE_PERSIST = os.getenv("EDA_PROFILE_CACHE_PERSIST", "1") == "1"
+PROFILE_CACHE_MAX_BYTES = int(os.getenv("EDA_PROFILE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+class ProfileCache:
+    """
+    In-memory LRU of profiles keyed by dataset fingerprint, with optional
+    pickle persistence on disk so page refreshes and server restarts reuse
+    earlier work. Counts memory hits, disk hits and misses.
+    Sessions share one cache, so the LRU and counters change under a lock;
+    disk reads and writes happen outside it.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_ENTRIES, cache_dir: str = None,
+                 max_bytes: int = PROFILE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    profile = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                # Corrupt or written by an incompatible version: treat as a miss
+                profile = None
+            if profile is not None:
+                touch(self._path(key))
+                with self.lock:
+                    self.disk_hits += 1
+                    self._remember(key, profile)
+                return profile
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, profile: dict):
+        """Inserts into the LRU; callers hold self.lock."""
+        self.entries[key] = profile
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key: str, profile: dict):
+        with self.lock:
+            self._remember(key, profile)
+        if self.cache_dir:
+            def write(tmp_path):
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(profile, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            try:
+                store_cache_file(self._path(key), write, self.max_bytes, suffix=".pkl")
+            except (OSError, pickle.PicklingError):
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits, disk_hits, misses, entries = self.hits, self.disk_hits, self.misses, len(self.entries)
+        lookups = hits + disk_hits + misses
+        return {
+            "hits": hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": (hits + disk_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_CACHE = ProfileCache(cache_dir=PROFILE_CACHE_DIR if PROFILE_CACHE_PERSIST else None)
+
+
+def cached_profile_dataset(df: pd.DataFrame, **options) -> dict:
+    """
+    profile_dataset with a fingerprint-keyed cache. Options are passed
+    through to profile_dataset and are part of the key.
+    """
+    key = dataframe_fingerprint(df)
+    if options:
+        options_key = hashlib.blake2b(repr(sorted(options.items())).encode(), digest_size=8)
+        key = f"{key}-{options_key.hexdigest()}"
+
+    profile = _CACHE.get(key)
+    if profile is None:
+        profile = profile_dataset(df, **options)
+        _CACHE.put(key, profile)
+    return profile
+
+
+def profile_cache_stats() -> dict:
+    """Hit/miss counters of the shared profile cache."""
+    return _CACHE.stats()
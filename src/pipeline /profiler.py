@@ -1,36 +1,509 @@
 
 # src/pipeline/profiler.py
 
+import os
+import copy
+import math
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-def profile_dataset(df: pd.DataFrame) -> dict:
+from src.pipeline.sketches import MomentSketch, KLLSketch, HyperLogLog, MisraGries
+from src.tools.process_pool import get_process_pool, reset_process_pool
+
+PROFILE_CHUNK_SIZE = 250_000
+
+# Quantile mode: "exact", "approx" (KLL sketch) or "auto" (approx on large frames)
+QUANTILE_MODE = os.getenv("EDA_QUANTILE_MODE", "auto")
+QUANTILE_EPSILON = float(os.getenv("EDA_QUANTILE_EPSILON", "0.01"))
+APPROX_QUANTILE_MIN_ROWS = 1_000_000
+PERCENTILES = [0.25, 0.5, 0.75]
+STATS_COLUMNS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+# Parallel profiling: worker processes (1 = serial) and when to use them
+PROFILE_WORKERS = int(os.getenv("EDA_PROFILE_WORKERS", "1"))
+PARALLEL_MIN_COLUMNS = 64
+PARALLEL_BLOCKS_PER_WORKER = 4
+
+# Categorical sketches: HLL precision and heavy-hitter counters per column
+HLL_PRECISION = 14
+TOP_K_CAPACITY = 64
+
+
+def _is_numeric(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _merge_dtype(left, right):
+    """Dtype of a column seen with different dtypes in different partials."""
+    if left == right:
+        return left
+    if _is_numeric(left) and _is_numeric(right):
+        try:
+            return np.promote_types(left, right)
+        except TypeError:
+            return np.dtype("float64")
+    return np.dtype("object")
+
+
+class ColumnState:
+    """
+    Mergeable per-column profile state: dtype, null count, numeric moments
+    and, in approximate mode, a KLL quantile sketch. Non-numeric columns
+    keep a HyperLogLog distinct count and Misra-Gries heavy hitters instead.
+    """
+
+    def __init__(self, dtype, quantile_epsilon=None):
+        self.dtype = dtype
+        self.nulls = 0
+        self.moments = MomentSketch() if _is_numeric(dtype) else None
+        self.quantiles = (
+            KLLSketch.from_epsilon(quantile_epsilon)
+            if quantile_epsilon and self.moments is not None else None
+        )
+        categorical = self.moments is None
+        self.distinct = HyperLogLog(HLL_PRECISION) if categorical else None
+        self.top = MisraGries(TOP_K_CAPACITY) if categorical else None
+
+    def merge(self, other: "ColumnState") -> "ColumnState":
+        self.dtype = _merge_dtype(self.dtype, other.dtype)
+        self.nulls += other.nulls
+        if self.moments is not None and other.moments is not None:
+            self.moments.merge(other.moments)
+        elif other.moments is not None and _is_numeric(self.dtype):
+            self.moments = other.moments
+        elif not _is_numeric(self.dtype):
+            self.moments = None
+
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        elif self.moments is None or other.quantiles is None:
+            # Quantiles are only valid if every partial was sketched
+            self.quantiles = None
+
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct.merge(other.distinct)
+            self.top.merge(other.top)
+        else:
+            self.distinct = self.top = None
+        return self
+
+
+class ProfileState:
+    """
+    Single-pass, mergeable profile of a dataset.
+    Feed it chunks with update(), combine partials with merge(), and
+    render the classic profile dict with to_profile().
+    With quantile_epsilon set, numeric columns also carry KLL sketches and
+    the stats table gets approximate percentiles.
+    """
+
+    def __init__(self, quantile_epsilon=None):
+        self.n_rows = 0
+        self.columns = {}
+        self.quantile_epsilon = quantile_epsilon
+
+    def update(self, chunk: pd.DataFrame) -> "ProfileState":
+        """
+        Folds one chunk into the state in a single vectorized pass. A chunk
+        whose dtypes differ from the state's (ints then floats, numbers then
+        text, as read_csv chunks can be) is profiled on its own and merged,
+        so the dtype is promoted and no chunk is skipped.
+        """
+        if any(col in self.columns and self.columns[col].dtype != dtype for col, dtype in chunk.dtypes.items()):
+            return self.merge(ProfileState(self.quantile_epsilon)._fold(chunk))
+        return self._fold(chunk)
+
+    def _fold(self, chunk: pd.DataFrame) -> "ProfileState":
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnState(chunk[col].dtype, self.quantile_epsilon)
+
+        self.n_rows += len(chunk)
+        null_counts = chunk.isna().sum()
+
+        numeric_cols = [
+            col for col in chunk.columns
+            if self.columns[col].moments is not None and _is_numeric(chunk[col].dtype)
+        ]
+        if numeric_cols and len(chunk):
+            values = chunk[numeric_cols].to_numpy(dtype="float64", na_value=np.nan)
+            valid = ~np.isnan(values)
+            counts = valid.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                sums = np.where(valid, values, 0.0).sum(axis=0)
+                means = sums / counts
+                m2 = np.where(valid, values - means, 0.0)
+                m2 = np.square(m2).sum(axis=0)
+                mins = np.where(valid, values, np.inf).min(axis=0)
+                maxs = np.where(valid, values, -np.inf).max(axis=0)
+
+            for i, col in enumerate(numeric_cols):
+                state = self.columns[col]
+                state.moments.update_moments(counts[i], means[i], m2[i], mins[i], maxs[i])
+                if state.quantiles is not None:
+                    state.quantiles.update(values[valid[:, i], i])
+
+        for col in chunk.columns:
+            state = self.columns[col]
+            state.nulls += int(null_counts[col])
+            if state.distinct is not None and not _is_numeric(chunk[col].dtype):
+                values = chunk[col].dropna()
+                state.distinct.update_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+                state.top.update_counts(values.value_counts(sort=False))
+
+        return self
+
+    def merge(self, other: "ProfileState") -> "ProfileState":
+        """
+        Combines a partial profile over other rows (another chunk or file).
+        Columns missing from one side count as nulls for that side's rows,
+        matching what pd.concat of the underlying frames would produce.
+        """
+        for col, state in self.columns.items():
+            if col not in other.columns:
+                state.nulls += other.n_rows
+        for col, state in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(state)
+            else:
+                state.nulls += self.n_rows
+                self.columns[col] = state
+        self.n_rows += other.n_rows
+        return self
+
+    def merge_columns(self, other: "ProfileState") -> "ProfileState":
+        """Combines a partial profile over other columns of the same rows."""
+        self.columns.update(other.columns)
+        self.n_rows = max(self.n_rows, other.n_rows)
+        return self
+
+    def to_profile(self) -> dict:
+        """Renders the profile dict consumed by the UI."""
+        names = list(self.columns)
+
+        missing_values = pd.DataFrame(
+            {"Missing Count": [self.columns[c].nulls for c in names]},
+            index=names
+        ).assign(Percentage=lambda x: (x["Missing Count"] / self.n_rows) * 100 if self.n_rows else 0.0)
+
+        column_types = pd.DataFrame({"Type": [self.columns[c].dtype for c in names]}, index=names)
+
+        rows = {}
+        for col in names:
+            moments = self.columns[col].moments
+            if moments is None:
+                continue
+            empty = moments.count == 0
+            rows[col] = {
+                "count": float(moments.count),
+                "mean": math.nan if empty else moments.mean,
+                "std": moments.std,
+                "min": math.nan if empty else moments.min,
+                "max": math.nan if empty else moments.max,
+            }
+            # Exact percentiles need the data: profile_dataset fills them in,
+            # otherwise they stay NaN so the table keeps the describe() layout
+            sketch = self.columns[col].quantiles
+            percentiles = sketch.quantile(PERCENTILES) if sketch is not None else [math.nan] * len(PERCENTILES)
+            for q, value in zip(PERCENTILES, percentiles):
+                rows[col][f"{q:.0%}"] = value
+        stats = pd.DataFrame.from_dict(rows, orient="index") if rows else pd.DataFrame()
+        if set(STATS_COLUMNS) <= set(stats.columns):
+            stats = stats[STATS_COLUMNS]
+
+        categorical = {}
+        for col in names:
+            state = self.columns[col]
+            if state.distinct is None:
+                continue
+            top = state.top.top(1)
+            categorical[col] = {
+                "Distinct (approx)": state.distinct.count(),
+                "Top Value": str(top.index[0]) if len(top) else None,
+                "Top Count": int(top.iloc[0]) if len(top) else 0,
+            }
+        categorical = pd.DataFrame.from_dict(categorical, orient="index") if categorical else pd.DataFrame()
+
+        return {
+            "missing_values": missing_values,
+            "column_types": column_types,
+            "stats": stats,
+            "categorical": categorical,
+            "state": self,
+        }
+
+
+def iter_chunks(df: pd.DataFrame, chunksize: int = PROFILE_CHUNK_SIZE):
+    """Yields row-slices of an in-memory frame."""
+    for start in range(0, max(len(df), 1), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def profile_chunks(chunks, quantile_epsilon=QUANTILE_EPSILON) -> ProfileState:
+    """
+    Builds a ProfileState from any iterable of DataFrame chunks
+    (e.g. read_csv(chunksize=...)). Chunks are seen once, so percentiles are
+    sketched (rank error about quantile_epsilon) and to_profile() gives the
+    full stats table; pass None to skip the sketches and leave them NaN.
+    """
+    state = ProfileState(quantile_epsilon)
+    for chunk in chunks:
+        state.update(chunk)
+    return state
+
+
+def _exact_percentiles(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Exact 25/50/75% of the given numeric columns."""
+    if not columns:
+        return pd.DataFrame()
+    quantiles = df[columns].astype("float64").quantile(PERCENTILES).T
+    quantiles.columns = [f"{q:.0%}" for q in PERCENTILES]
+    return quantiles
+
+
+def _with_percentiles(stats: pd.DataFrame, quantiles: pd.DataFrame) -> pd.DataFrame:
+    """Adds exact percentile columns, keeping the describe() column order."""
+    if stats.empty:
+        return stats
+    stats = stats.drop(columns=quantiles.columns, errors="ignore").join(quantiles)
+    return stats[STATS_COLUMNS]
+
+
+def _use_approx_quantiles(df: pd.DataFrame, mode: str) -> bool:
+    if mode == "auto":
+        return len(df) >= APPROX_QUANTILE_MIN_ROWS
+    return mode == "approx"
+
+
+def _profile_frame(df: pd.DataFrame, chunksize: int, quantile_epsilon=None):
+    """Profiles one frame (or column block): state plus exact percentiles unless sketched."""
+    state = profile_chunks(iter_chunks(df, chunksize), quantile_epsilon)
+    quantiles = None
+    if not quantile_epsilon:
+        numeric = [col for col, col_state in state.columns.items() if col_state.moments is not None]
+        quantiles = _exact_percentiles(df, numeric)
+    return state, quantiles
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attaches to the parent's segment; the parent owns and unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers; spawned workers share the parent's
+        # resource tracker, so this only repeats the parent's registration
+        return shared_memory.SharedMemory(name=name)
+
+
+def _read_shared_columns(buffer, positions: list, labels: list) -> pd.DataFrame:
+    """
+    Converts the columns at positions of the shared Arrow stream and gives
+    them back their original (possibly non-string) labels.
+    """
+    table = pa.ipc.open_stream(pa.py_buffer(buffer)).read_all()
+    block = table.select(positions).to_pandas()
+    block.columns = labels
+    return block
+
+
+def _profile_shared_block(shm_name: str, size: int, positions: list, labels: list,
+                          chunksize: int, quantile_epsilon):
+    """Worker: profiles a column block of the Arrow stream held in shared memory."""
+    shm = _attach_shared_memory(shm_name)
+    try:
+        block = _read_shared_columns(shm.buf[:size], positions, labels)
+        result = _profile_frame(block, chunksize, quantile_epsilon)
+        del block
+    finally:
+        shm.close()
+    return result
+
+
+def _write_shared_stream(table: pa.Table, shm: shared_memory.SharedMemory):
+    # Kept in its own frame so no Arrow view of shm.buf outlives the write
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+
+
+def _column_blocks(columns: list, n_blocks: int) -> list:
+    n_blocks = max(1, min(n_blocks, len(columns)))
+    size = math.ceil(len(columns) / n_blocks)
+    return [columns[i:i + size] for i in range(0, len(columns), size)]
+
+
+def _profile_parallel(df: pd.DataFrame, chunksize: int, quantile_epsilon, workers: int):
+    """
+    Splits columns into blocks profiled by a process pool. The frame is
+    written once as an Arrow IPC stream into shared memory; each worker
+    maps it without copying and converts only its own columns, so the
+    frame is never pickled per worker.
+    """
+    # Positional names: Arrow would str() labels, and 0 and "0" would clash
+    labels = df.columns.tolist()
+    table = pa.Table.from_pandas(df.set_axis([str(i) for i in range(len(labels))], axis=1),
+                                 preserve_index=False)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        _write_shared_stream(table, shm)
+        del table
+
+        pool = get_process_pool("profile", workers)
+        blocks = _column_blocks(list(range(len(labels))), workers * PARALLEL_BLOCKS_PER_WORKER)
+        state = ProfileState(quantile_epsilon)
+        quantiles = []
+        try:
+            futures = [
+                pool.submit(_profile_shared_block, shm.name, size, block,
+                            [labels[i] for i in block], chunksize, quantile_epsilon)
+                for block in blocks
+            ]
+            for future in futures:
+                block_state, block_quantiles = future.result()
+                state.merge_columns(block_state)
+                if block_quantiles is not None:
+                    quantiles.append(block_quantiles)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); the next call respawns the pool
+            reset_process_pool("profile", workers, pool)
+            raise
+    finally:
+        shm.close()
+        shm.unlink()
+
+    state.n_rows = len(df)
+    state.columns = {col: state.columns[col] for col in df.columns}
+    return state, (pd.concat(quantiles) if quantiles else None)
+
+
+def profile_dataset(df: pd.DataFrame, chunksize: int = PROFILE_CHUNK_SIZE,
+                    quantiles: str = QUANTILE_MODE, epsilon: float = QUANTILE_EPSILON,
+                    workers: int = PROFILE_WORKERS) -> dict:
     """
-    Performs lightweight EDA profiling.
+    Performs lightweight EDA profiling in a single chunked pass.
+    quantiles="approx" answers percentiles from per-column KLL sketches
+    (rank error about epsilon) instead of sorting every column; "auto"
+    does so for frames of APPROX_QUANTILE_MIN_ROWS rows or more.
+    With workers > 1, frames of PARALLEL_MIN_COLUMNS columns or more are
+    profiled in column blocks across a process pool.
     Returns:
         A dictionary containing:
         - missing_values: missing count & percentage
         - column_types: dtype classification
         - stats: basic statistics for numeric columns
+        - categorical: approximate distinct count and top value per non-numeric column
+        - state: the mergeable ProfileState behind the tables
     """
-    # Missing values info
-    missing_values = (
-        df.isnull().sum()
-        .to_frame("Missing Count")
-        .assign(Percentage=lambda x: (x["Missing Count"] / len(df)) * 100)
-    )
-
-    # Column type info
-    column_types = df.dtypes.to_frame("Type")
-
-    # Basic numeric stats
-    numeric_df = df.select_dtypes(include="number")
-    stats = numeric_df.describe().T if not numeric_df.empty else pd.DataFrame()
-
-    # Build profile dictionary
-    profile = {
-        "missing_values": missing_values,
-        "column_types": column_types,
-        "stats": stats
-    }
+    approx = _use_approx_quantiles(df, quantiles)
+    quantile_epsilon = epsilon if approx else None
+
+    state = percentiles = None
+    if workers > 1 and df.shape[1] >= PARALLEL_MIN_COLUMNS:
+        try:
+            state, percentiles = _profile_parallel(df, chunksize, quantile_epsilon, workers)
+        except (pa.ArrowException, OSError, BrokenProcessPool):
+            # Frames Arrow cannot represent (mixed object columns), or a dead
+            # worker, fall back to the serial path
+            state = None
+    if state is None:
+        state, percentiles = _profile_frame(df, chunksize, quantile_epsilon)
 
+    profile = state.to_profile()
+    if percentiles is not None:
+        profile["stats"] = _with_percentiles(profile["stats"], percentiles)
     return profile
+
+
+def update_profile(profile: dict, before: pd.DataFrame, after: pd.DataFrame,
+                   changed_columns=(), chunksize: int = PROFILE_CHUNK_SIZE) -> dict:
+    """
+    Derives the profile of a cleaned frame from the profile of the frame it
+    was cleaned from, recomputing only what cleaning touched:
+    - columns in changed_columns (e.g. imputed) are re-profiled;
+    - for rows dropped from `before`, columns that were null in all of them
+      only get their null count lowered, and columns holding values in
+      them are re-profiled.
+    Untouched column states are shared with the original profile.
+    The returned profile records the changes under "lineage".
+    """
+    base = profile["state"]
+    dropped = before[~before.index.isin(after.index)] if len(after) < len(before) else before.iloc[:0]
+
+    recompute = [col for col in after.columns if col in set(changed_columns) or col not in base.columns]
+    if len(dropped):
+        values_dropped = dropped.notna().any()
+        recompute += [col for col in after.columns if values_dropped.get(col, False) and col not in recompute]
+
+    state = ProfileState(base.quantile_epsilon)
+    state.n_rows = len(after)
+    for col in after.columns:
+        if col in recompute:
+            continue
+        col_state = copy.copy(base.columns[col])
+        col_state.nulls -= len(dropped)
+        state.columns[col] = col_state
+
+    percentiles = None
+    if recompute:
+        fresh, percentiles = _profile_frame(after[recompute], chunksize, base.quantile_epsilon)
+        state.merge_columns(fresh)
+    state.n_rows = len(after)
+    state.columns = {col: state.columns[col] for col in after.columns}
+
+    updated = state.to_profile()
+    if base.quantile_epsilon is None and not updated["stats"].empty:
+        kept = profile["stats"].reindex(
+            [col for col in updated["stats"].index if col not in recompute]
+        )[[f"{q:.0%}" for q in PERCENTILES]]
+        percentiles = pd.concat([kept, percentiles]) if percentiles is not None else kept
+        updated["stats"] = _with_percentiles(updated["stats"], percentiles)
+
+    updated["lineage"] = {
+        "changed_columns": list(changed_columns),
+        "dropped_rows": len(dropped),
+        "recomputed_columns": recompute,
+    }
+    return updated
+
+
+def column_quantile(profile: dict, col: str, q: float = 0.5):
+    """
+    Looks up a quantile of a numeric column from a profile without touching
+    the data: the column's KLL sketch when present, else the stats table.
+    Returns None when the profile cannot answer.
+    """
+    if profile is None:
+        return None
+
+    state = profile.get("state")
+    if state is not None and col in state.columns and state.columns[col].quantiles is not None:
+        return state.columns[col].quantiles.quantile(q)
+
+    label = f"{q:.0%}"
+    stats = profile.get("stats")
+    if stats is not None and label in stats.columns and col in stats.index:
+        return stats.loc[col, label]
+    return None
+
+
+def column_top_values(profile: dict, col: str, k: int = None):
+    """
+    Heavy hitters of a non-numeric column from a profile's Misra-Gries
+    summary, as a value -> count Series. None when the profile cannot answer.
+    """
+    if profile is None:
+        return None
+
+    state = profile.get("state")
+    if state is None or col not in state.columns or state.columns[col].top is None:
+        return None
+    return state.columns[col].top.top(k)
@@ -1,97 +1,230 @@
 
 # src/pipeline/report_builder.py
 
+import io
 import os
+import zlib
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
-
-REPORT_CHART_DIR = "src/data/report_charts"
-
-# Ensure chart directory exists
-os.makedirs(REPORT_CHART_DIR, exist_ok=True)
-
-
-def _save_chart(fig, filename: str) -> str:
-    """Save chart to disk and return its filepath."""
-    path = os.path.join(REPORT_CHART_DIR, filename)
-    fig.savefig(path, bbox_inches="tight")
-    plt.close(fig)
-    return path
+from PIL import Image
+from matplotlib.figure import Figure
+from src.tools.chart_generator import top_value_counts, HEATMAP_ANNOT_MAX
+from src.tools.downsampling import downsampled_line_data, plot_line_data
+from src.tools.chart_aggregation import (
+    AGGREGATE_MIN_ROWS, HIST_BINS, histogram_counts, kde_curve, scatter_density, box_stats,
+    plot_histogram, plot_density, plot_box
+)
+from src.pipeline.correlation import get_heatmap_matrix, numeric_columns
+from src.tools.process_pool import get_process_pool, reset_process_pool
+
+# Charts render in a process pool when more than one worker is configured
+REPORT_WORKERS = int(os.getenv("EDA_REPORT_WORKERS", "1"))
+
+# Image budget: charts are rendered at their embedded size (points) and
+# REPORT_IMAGE_DPI, then quantized to a small palette. Dense plots keep a
+# full palette (colour gradients) and switch to JPEG when that is smaller.
+REPORT_IMAGE_SIZE = (450, 250)
+REPORT_IMAGE_DPI = int(os.getenv("EDA_REPORT_IMAGE_DPI", "120"))
+REPORT_PALETTE_COLORS = 64
+REPORT_DENSE_PALETTE_COLORS = 256
+REPORT_JPEG_QUALITY = 85
+REPORT_DENSE_KINDS = ("density", "heatmap", "scatter")
 
 
 def _get_numeric_cols(df):
-    return df.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    # Any width: the loader downcasts to int8/float32 and friends
+    return numeric_columns(df)
 
 
 def _get_cat_cols(df):
-    return df.select_dtypes(include=["object"]).columns.tolist()
+    return df.select_dtypes(include=["object", "category", "string"]).columns.tolist()
 
 
 def _get_date_cols(df):
-    return df.select_dtypes(include=["datetime64[ns]"]).columns.tolist()
-
-
-def generate_report_charts(df):
-    """Automatically selects and generates up to 6 charts."""
-
+    return [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+
+
+def _draw_chart(ax, spec: dict):
+    kind = spec["kind"]
+    if kind == "histogram":
+        plot_histogram(ax, spec["counts"], spec["edges"], kde=spec["kde"])
+    elif kind == "box":
+        plot_box(ax, spec["stats"])
+    elif kind == "bar":
+        ax.bar(range(len(spec["values"])), spec["values"])
+        ax.set_xticks(range(len(spec["labels"])), spec["labels"], rotation=90)
+    elif kind == "density":
+        plot_density(ax, spec["density"])
+    elif kind == "scatter":
+        sns.scatterplot(x=spec["x"], y=spec["y"], ax=ax)
+    elif kind == "line":
+        plot_line_data(ax, spec["line"])
+    elif kind == "heatmap":
+        sns.heatmap(spec["corr"], annot=len(spec["corr"]) <= HEATMAP_ANNOT_MAX, cmap="coolwarm", ax=ax)
+
+    ax.set_title(spec["title"])
+    if spec.get("xlabel"):
+        ax.set_xlabel(spec["xlabel"])
+    if spec.get("ylabel"):
+        ax.set_ylabel(spec["ylabel"])
+
+
+def embedded_size(image: bytes) -> int:
+    """
+    Bytes an image takes inside the PDF: ReportLab copies JPEG data as is
+    but decodes anything else to RGB and deflates it.
+    """
+    if image[:2] == b"\xff\xd8":
+        return len(image)
+    with Image.open(io.BytesIO(image)) as im:
+        return len(zlib.compress(im.convert("RGB").tobytes()))
+
+
+def encode_report_image(png: bytes, kind: str) -> bytes:
+    """
+    Applies the image budget to a rendered chart: RGB without alpha (no
+    soft mask in the PDF), quantized to a palette, or JPEG for dense plot
+    kinds when that is smaller once embedded.
+    Returns PNG or JPEG bytes.
+    """
+    dense = kind in REPORT_DENSE_KINDS
+    with Image.open(io.BytesIO(png)) as im:
+        rgb = im.convert("RGB")
+
+    buffer = io.BytesIO()
+    colors = REPORT_DENSE_PALETTE_COLORS if dense else REPORT_PALETTE_COLORS
+    rgb.quantize(colors).save(buffer, format="png", optimize=True)
+    encoded = buffer.getvalue()
+
+    if dense:
+        buffer = io.BytesIO()
+        rgb.save(buffer, format="jpeg", quality=REPORT_JPEG_QUALITY, optimize=True)
+        if buffer.tell() < embedded_size(encoded):
+            encoded = buffer.getvalue()
+    return encoded
+
+
+def render_chart(spec: dict) -> bytes:
+    """
+    Renders one chart spec at its embedded size and REPORT_IMAGE_DPI with
+    the object-oriented Figure API (no pyplot state), so it is safe to run
+    concurrently in pool workers. Returns budget-encoded PNG or JPEG bytes.
+    """
+    width, height = REPORT_IMAGE_SIZE
+    fig = Figure(figsize=(width / 72, height / 72), dpi=REPORT_IMAGE_DPI, layout="constrained")
+    _draw_chart(fig.add_subplot(), spec)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=REPORT_IMAGE_DPI)
+    return encode_report_image(buffer.getvalue(), spec["kind"])
+
+
+def build_chart_specs(df, profile=None, data_key: str = None):
+    """
+    Automatically selects up to 6 charts and reduces each to the small
+    arrays it draws (bin counts, box statistics, top-k counts, density grid,
+    downsampled line, correlation matrix), so rendering never touches df.
+    data_key (the cleaning plan's version key) keys the cached correlations.
+    Returns (specs, captions).
+    """
     numeric_cols = _get_numeric_cols(df)
     cat_cols = _get_cat_cols(df)
     date_cols = _get_date_cols(df)
 
-    chart_paths = []
+    specs = []
     captions = []
 
     # 1️⃣ Histogram
     if numeric_cols:
         col = numeric_cols[0]
-        fig = plt.figure()
-        sns.histplot(df[col], kde=True)
-        plt.title(f"Distribution of {col}")
-        chart_paths.append(_save_chart(fig, "histogram.png"))
+        # Binned counts plus a KDE fitted on a sample, instead of a full-data KDE
+        counts, edges = histogram_counts(df[col], HIST_BINS)
+        specs.append({
+            "kind": "histogram", "counts": counts, "edges": edges,
+            "kde": kde_curve(df[col], edges, total=int(counts.sum())),
+            "title": f"Distribution of {col}", "xlabel": col,
+        })
         captions.append(f"Histogram of {col} — distribution of values.")
 
     # 2️⃣ Boxplot
     if numeric_cols:
         col = numeric_cols[0]
-        fig = plt.figure()
-        sns.boxplot(x=df[col])
-        plt.title(f"Boxplot of {col}")
-        chart_paths.append(_save_chart(fig, "boxplot.png"))
-        captions.append(f"Boxplot of {col} — outlier detection.")
+        stats = box_stats(df[col])
+        if stats is not None:
+            specs.append({"kind": "box", "stats": stats, "title": f"Boxplot of {col}", "xlabel": col})
+            captions.append(f"Boxplot of {col} — outlier detection.")
 
     # 3️⃣ Bar chart for categorical
     if cat_cols:
         col = cat_cols[0]
-        fig = plt.figure()
-        df[col].value_counts().plot(kind="bar")
-        plt.title(f"Distribution of {col}")
-        chart_paths.append(_save_chart(fig, "bar_chart.png"))
+        counts = top_value_counts(df, col, profile)
+        specs.append({
+            "kind": "bar", "labels": [str(label) for label in counts.index], "values": counts.to_numpy(),
+            "title": f"Distribution of {col}", "xlabel": col,
+        })
         captions.append(f"Distribution of {col} — frequency counts.")
 
     # 4️⃣ Scatter plot
     if len(numeric_cols) >= 2:
-        fig = plt.figure()
-        sns.scatterplot(x=df[numeric_cols[0]], y=df[numeric_cols[1]])
-        plt.title(f"{numeric_cols[0]} vs {numeric_cols[1]}")
-        chart_paths.append(_save_chart(fig, "scatter.png"))
-        captions.append("Scatter plot — correlation between numeric values.")
+        x_col, y_col = numeric_cols[0], numeric_cols[1]
+        spec = {"title": f"{x_col} vs {y_col}", "xlabel": x_col, "ylabel": y_col}
+        if len(df) > AGGREGATE_MIN_ROWS:
+            spec.update({"kind": "density", "density": scatter_density(df[x_col], df[y_col])})
+        else:
+            spec.update({"kind": "scatter", "x": df[x_col].to_numpy(), "y": df[y_col].to_numpy()})
+        if spec["kind"] == "scatter" or spec["density"] is not None:
+            specs.append(spec)
+            captions.append("Scatter plot — correlation between numeric values.")
 
     # 5️⃣ Line chart (trend)
     if date_cols and numeric_cols:
-        fig = plt.figure()
-        sns.lineplot(x=df[date_cols[0]], y=df[numeric_cols[0]])
-        plt.title(f"Trend of {numeric_cols[0]} over time")
-        chart_paths.append(_save_chart(fig, "line.png"))
+        # Time-resampled mean with a min/max band instead of every row plus bootstrap CIs
+        specs.append({
+            "kind": "line", "line": downsampled_line_data(df[numeric_cols[0]], df[date_cols[0]]),
+            "title": f"Trend of {numeric_cols[0]} over time", "xlabel": date_cols[0], "ylabel": numeric_cols[0],
+        })
         captions.append("Line chart — numeric trend over dates.")
 
     # 6️⃣ Correlation Heatmap
     if len(numeric_cols) >= 2:
-        corr = df[numeric_cols].corr()
-        fig = plt.figure(figsize=(6, 5))
-        sns.heatmap(corr, annot=True, cmap="coolwarm")
-        plt.title("Correlation Heatmap")
-        chart_paths.append(_save_chart(fig, "heatmap.png"))
+        specs.append({
+            "kind": "heatmap", "corr": get_heatmap_matrix(df[numeric_cols], data_key=data_key),
+            "title": "Correlation Heatmap",
+        })
         captions.append("Heatmap — strength of numeric relationships.")
 
-    return chart_paths, captions
+    return specs, captions
+
+
+def generate_report_charts(df, profile=None, workers: int = REPORT_WORKERS, progress=None,
+                           data_key: str = None):
+    """
+    Automatically selects and generates up to 6 charts.
+    Pass the profile of df to reuse its categorical top-k summaries.
+    Charts are rendered from pre-aggregated specs, across a process pool
+    when workers > 1, and returned as in-memory PNGs: nothing is written to
+    a shared folder, so concurrent reports cannot overwrite each other.
+    progress, if given, is called as progress("charts", fraction_done).
+    Returns (list of PNG bytes, captions).
+    """
+    specs, captions = build_chart_specs(df, profile, data_key)
+    images = []
+
+    def add(png):
+        images.append(png)
+        if progress is not None:
+            progress("charts", len(images) / len(specs))
+
+    if workers > 1 and len(specs) > 1:
+        pool = get_process_pool("report", workers)
+        try:
+            for png in pool.map(render_chart, specs):
+                add(png)
+        except BrokenProcessPool:
+            # A worker died; the remaining charts render here, the next call respawns the pool
+            reset_process_pool("report", workers, pool)
+
+    for spec in specs[len(images):]:
+        add(render_chart(spec))
+
+    return images, captions
@@ -0,0 +1,223 @@
+
+# src/pipeline/report_jobs.py
+
+import os
+import uuid
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tools.utils import content_fingerprint
+from src.pipeline.pdf_report import cached_pdf_report, REPORT_CACHE_DIR
+
+# Report builds running at once per server; further requests wait in the queue
+REPORT_JOB_WORKERS = int(os.getenv("EDA_REPORT_JOB_WORKERS", "2"))
+# Finished jobs kept for polling before the oldest are forgotten
+REPORT_JOB_HISTORY = 64
+
+# Overall progress range covered by each stage
+REPORT_STAGES = {
+    "queued": (0.0, 0.0),
+    "insights": (0.0, 0.3),
+    "charts": (0.3, 0.8),
+    "pdf": (0.8, 1.0),
+}
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+
+class ReportCancelled(Exception):
+    """Raised inside a report build when its job has been cancelled."""
+
+
+class ReportJob:
+    """
+    One background report build: LLM insights, charts, then the PDF.
+    The worker thread updates state / stage / progress as it goes and
+    checks the cancel event between steps.
+    """
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.state = "queued"
+        self.stage = "queued"
+        self.progress = 0.0
+        self.path = None
+        # (section, bytes, note) rows of the finished PDF
+        self.breakdown = []
+        self.error = None
+        self.created = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        # ids of the tickets still waiting on this build
+        self.subscribers = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def report(self, stage: str, fraction: float = 0.0):
+        """Progress callback passed to the build; aborts it once cancelled."""
+        if self.cancel_event.is_set():
+            raise ReportCancelled(self.id)
+        low, high = REPORT_STAGES.get(stage, (self.progress, self.progress))
+        self.stage = stage
+        self.progress = max(self.progress, low + (high - low) * min(max(fraction, 0.0), 1.0))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id, "state": self.state, "stage": self.stage,
+            "progress": self.progress, "path": self.path, "error": self.error,
+        }
+
+
+class ReportTicket:
+    """
+    One session's handle on a (possibly shared) ReportJob. It reads like the
+    job, except that cancelling it only detaches this subscriber: the build
+    itself stops once every ticket on it has been cancelled.
+    """
+
+    def __init__(self, job: ReportJob):
+        self.id = uuid.uuid4().hex[:12]
+        self.job = job
+        self.cancelled = False
+
+    @property
+    def state(self) -> str:
+        return "cancelled" if self.cancelled else self.job.state
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def __getattr__(self, name):
+        # stage, progress, path, error, ... come from the shared job
+        return getattr(self.job, name)
+
+    def to_dict(self) -> dict:
+        return {**self.job.to_dict(), "id": self.id, "state": self.state}
+
+
+def report_request_key(data_key: str, prompt: str) -> str:
+    """Identity of a report request: dataset identity plus the LLM prompt."""
+    digest = hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest()
+    return f"{data_key}-{digest}"
+
+
+class ReportJobManager:
+    """
+    Runs report builds on a bounded thread pool so the Streamlit script
+    thread never blocks on them. Identical requests (same dataset and
+    prompt) submitted while one is queued or running share its job; each
+    submit returns its own ReportTicket on it.
+    """
+
+    def __init__(self, workers: int = REPORT_JOB_WORKERS, output_dir: str = REPORT_CACHE_DIR,
+                 history: int = REPORT_JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="report")
+        self.output_dir = output_dir
+        self.history = history
+        self.jobs = OrderedDict()
+        self.tickets = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def submit(self, df, prompt: str, llm, profile: dict = None, data_key: str = None) -> ReportTicket:
+        """
+        Queues a report build (or joins the identical one in flight) and
+        returns a ticket on it.
+        llm is invoked with prompt on the worker thread. data_key identifies
+        df (the cleaning plan's version key); without it the content is hashed.
+        """
+        data_key = data_key or content_fingerprint(df)
+        key = report_request_key(data_key, prompt)
+        with self.lock:
+            job = self.in_flight.get(key)
+            if job is None or job.finished or job.cancel_event.is_set():
+                job = ReportJob(key)
+                self.jobs[job.id] = job
+                self.in_flight[key] = job
+                job.future = self.executor.submit(self._run, job, df, prompt, llm, profile, data_key)
+
+            ticket = ReportTicket(job)
+            job.subscribers.add(ticket.id)
+            self.tickets[ticket.id] = ticket
+            self._forget_finished()
+        return ticket
+
+    def _run(self, job: ReportJob, df, prompt: str, llm, profile: dict, data_key: str):
+        try:
+            job.state = "running"
+            job.report("insights", 0.0)
+            insights = llm.invoke(prompt).content
+            job.report("insights", 1.0)
+
+            path = cached_pdf_report(df, insights, profile=profile, progress=job.report,
+                                     cache_dir=self.output_dir, data_key=data_key, breakdown=job.breakdown)
+            job.report("pdf", 1.0)
+            job.path = path
+            job.state = "done"
+        except ReportCancelled:
+            job.state = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self.lock:
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+
+    def _forget_finished(self):
+        for entries in (self.tickets, self.jobs):
+            finished = [entry_id for entry_id, entry in entries.items() if entry.finished]
+            for entry_id in finished[:max(0, len(entries) - self.history)]:
+                del entries[entry_id]
+
+    def get(self, ticket_id: str):
+        return self.tickets.get(ticket_id) if ticket_id else None
+
+    def cancel(self, ticket_id: str) -> bool:
+        """
+        Cancels a ticket. The shared job is cancelled only when no other
+        ticket is still waiting on it: a queued job then never starts, a
+        running one stops at its next progress check (the LLM call and the
+        final PDF write are not interrupted). Returns False when the ticket
+        has already finished.
+        """
+        ticket = self.get(ticket_id)
+        if ticket is None or ticket.finished:
+            return False
+        job = ticket.job
+        with self.lock:
+            ticket.cancelled = True
+            job.subscribers.discard(ticket.id)
+            if job.subscribers:
+                return True
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                job.state = "cancelled"
+                job.finished_at = time.time()
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+        return True
+
+
+_MANAGER = ReportJobManager()
+
+
+def submit_report(df, prompt: str, llm, profile: dict = None, data_key: str = None) -> ReportTicket:
+    """Queues a PDF report build on the shared job manager; returns this caller's ticket."""
+    return _MANAGER.submit(df, prompt, llm, profile, data_key)
+
+
+def get_report_job(ticket_id: str):
+    return _MANAGER.get(ticket_id)
+
+
+def cancel_report_job(ticket_id: str) -> bool:
+    return _MANAGER.cancel(ticket_id)
@@ -0,0 +1,253 @@
+# src/pipeline/sketches.py
+
+import math
+import numpy as np
+import pandas as pd
+
+
+class MomentSketch:
+    """
+    Mergeable running moments for one numeric column:
+    count, mean, M2 (sum of squared deviations), min and max.
+    Chunks are folded in with Chan et al.'s parallel form of Welford's
+    update, so partial sketches from chunks, files or worker processes
+    combine exactly regardless of merge order.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _combine(self, count, mean, m2, min_, max_):
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = count, mean, m2
+            self.min, self.max = min_, max_
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+
+    def update(self, values: np.ndarray):
+        """Folds a 1-D array of non-null values into the sketch."""
+        values = np.asarray(values, dtype="float64")
+        if values.size == 0:
+            return
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+        self._combine(values.size, mean, m2, values.min(), values.max())
+
+    def update_moments(self, count, mean, m2, min_, max_):
+        """Folds precomputed chunk moments (e.g. from a vectorized pass) into the sketch."""
+        self._combine(int(count), float(mean), float(m2), float(min_), float(max_))
+
+    def merge(self, other: "MomentSketch") -> "MomentSketch":
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+
+class KLLSketch:
+    """
+    Mergeable approximate-quantile sketch (Karnin, Lang & Liberty).
+    Keeps a hierarchy of compactors; an item at level h stands for 2**h
+    inputs. The normalized rank error is roughly 1.7 / k, so
+    from_epsilon(0.01) answers quantiles within about 1% of rank.
+    """
+
+    def __init__(self, k: int = 200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        self._sorted = None
+
+    @classmethod
+    def from_epsilon(cls, epsilon: float, seed=None) -> "KLLSketch":
+        return cls(k=max(8, math.ceil(1.7 / epsilon)), seed=seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _add(self, level: int, items: np.ndarray):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                self.levels[level] = keep
+                self._add(level + 1, pairs[self._rng.integers(0, 2)::2])
+                # Capacities shrink as the hierarchy grows: rescan from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values: np.ndarray):
+        """
+        Folds a 1-D array of non-null values into the sketch. A large batch is
+        sorted once and strided straight to the level a chain of compactions
+        would have put it at, instead of being fed item by item.
+        """
+        values = np.asarray(values, dtype="float64")
+        if values.size == 0:
+            return
+        self.n += values.size
+        self._sorted = None
+
+        level = max(0, math.ceil(math.log2(values.size / self.k))) if values.size > self.k else 0
+        if level:
+            stride = 2 ** level
+            values = np.sort(values)[self._rng.integers(0, stride)::stride]
+        self._add(level, values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        self.k = min(self.k, other.k)
+        self.n += other.n
+        self._sorted = None
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        if self._sorted is None:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([
+                np.full(len(items), 2 ** level, dtype="float64")
+                for level, items in enumerate(self.levels)
+            ])
+            order = np.argsort(items, kind="stable")
+            self._sorted = (items[order], np.cumsum(weights[order]))
+        return self._sorted
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1]; NaN when the sketch is empty."""
+        items, cumulative = self._weighted()
+        q = np.asarray(q, dtype="float64")
+        if items.size == 0:
+            return np.full(q.shape, np.nan) if q.ndim else math.nan
+        ranks = q * cumulative[-1]
+        idx = np.minimum(np.searchsorted(cumulative, ranks, side="left"), items.size - 1)
+        result = items[idx]
+        return result if q.ndim else float(result)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_sorted"] = None
+        return state
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch over 64-bit hashes.
+    2**p one-byte registers; standard error is about 1.04 / sqrt(2**p)
+    (0.8% at the default p=14, using 16 KB per column).
+    """
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype="uint8")
+
+    def update_hashes(self, hashes: np.ndarray):
+        """Folds an array of uint64 hashes (e.g. pd.util.hash_array) into the registers."""
+        hashes = np.asarray(hashes, dtype="uint64")
+        if hashes.size == 0:
+            return
+        width = 64 - self.p
+        index = (hashes >> np.uint64(width)).astype("int64")
+        rest = hashes & np.uint64((1 << width) - 1)
+        # rest < 2**50, so the float64 exponent is its exact bit length
+        _, bit_length = np.frexp(rest.astype("float64"))
+        rank = (width - bit_length + 1).astype("uint8")
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.ldexp(1.0, -self.registers.astype("int64")).sum()
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class MisraGries:
+    """
+    Mergeable heavy-hitter summary (Misra-Gries, merged as in Agarwal et al.).
+    Keeps at most `capacity` counters; each reported count undercounts the
+    true count by at most `error`, which stays 0 (exact counts) as long as
+    the column has no more than `capacity` distinct values.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.n = 0
+        self.error = 0
+        self.counters = pd.Series(dtype="int64")
+
+    @property
+    def exact(self) -> bool:
+        return self.error == 0
+
+    def _fold(self, counts: pd.Series):
+        if self.counters.empty:
+            combined = counts
+        else:
+            combined = pd.concat([self.counters, counts]).groupby(level=0, sort=False).sum()
+        if len(combined) > self.capacity:
+            threshold = np.partition(combined.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)]
+            combined = combined - threshold
+            combined = combined[combined > 0]
+            self.error += int(threshold)
+        self.counters = combined.astype("int64")
+
+    def update_counts(self, counts: pd.Series):
+        """Folds a value -> count Series (e.g. a chunk's value_counts()) into the summary."""
+        counts = counts[counts > 0]
+        if counts.empty:
+            return
+        self.n += int(counts.sum())
+        self._fold(counts)
+
+    def merge(self, other: "MisraGries") -> "MisraGries":
+        self.capacity = min(self.capacity, other.capacity)
+        self.n += other.n
+        self.error += other.error
+        if not other.counters.empty:
+            self._fold(other.counters)
+        return self
+
+    def top(self, k: int = None) -> pd.Series:
+        """Heaviest values first, as a value -> count Series."""
+        top = self.counters.sort_values(ascending=False, kind="stable")
+        return top if k is None else top.head(k)
@@ -0,0 +1,102 @@
+# src/pipeline/test_profiler.py
+#
+# Checks that merged and incrementally updated profiles equal a full
+# re-profile. Run with: python -m pytest -q src/pipeline/test_profiler.py
+
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import numpy as np
+import pandas as pd
+
+from src.pipeline.profiler import ProfileState, profile_dataset, update_profile, iter_chunks
+
+ROWS = 20_000
+
+
+def _frame(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "age": rng.integers(18, 90, size=ROWS).astype("float64"),
+        "income": rng.lognormal(10, 1, size=ROWS),
+        "score": rng.normal(70, 10, size=ROWS),
+        "region": rng.choice(["north", "south", "east", "west"], size=ROWS),
+        "segment": rng.choice([f"seg_{i}" for i in range(30)], size=ROWS),
+    })
+    for col, rate in (("age", 0.05), ("income", 0.1), ("region", 0.02)):
+        df.loc[rng.random(size=ROWS) < rate, col] = np.nan
+    return df
+
+
+def _assert_same_profile(actual: dict, expected: dict, percentiles: bool = True):
+    pd.testing.assert_frame_equal(actual["missing_values"], expected["missing_values"])
+    assert list(actual["column_types"]["Type"].astype(str)) == list(expected["column_types"]["Type"].astype(str))
+
+    columns = list(expected["stats"].columns) if percentiles else ["count", "mean", "std", "min", "max"]
+    pd.testing.assert_frame_equal(actual["stats"][columns], expected["stats"][columns], rtol=1e-9)
+    pd.testing.assert_frame_equal(actual["categorical"], expected["categorical"], check_dtype=False)
+
+
+def test_merge_equals_full_profile():
+    df = _frame()
+    expected = profile_dataset(df, quantiles="exact", workers=1)
+
+    for split in (1, ROWS // 3, ROWS // 2, ROWS - 1):
+        for first, second in ((df.iloc[:split], df.iloc[split:]), (df.iloc[split:], df.iloc[:split])):
+            merged = ProfileState().update(first).merge(ProfileState().update(second))
+            # Row order only changes the order of tied heavy hitters, not the tables
+            _assert_same_profile(merged.to_profile(), expected, percentiles=False)
+
+
+def test_chunked_update_equals_full_profile():
+    df = _frame(1)
+    expected = profile_dataset(df, quantiles="exact", workers=1)
+
+    state = ProfileState()
+    for chunk in iter_chunks(df, 3_000):
+        state.update(chunk)
+    _assert_same_profile(state.to_profile(), expected, percentiles=False)
+
+
+def test_update_with_promoted_dtype():
+    # read_csv chunks: an integer chunk, then one with nulls (float), then text
+    first = pd.DataFrame({"x": np.arange(100, dtype="int64"), "y": np.arange(100, dtype="int64")})
+    second = pd.DataFrame({"x": [1.5, np.nan, 3.5], "y": ["a", "b", None]})
+
+    state = ProfileState().update(first).update(second)
+    profile = state.to_profile()
+    assert state.n_rows == 103
+    assert profile["missing_values"].loc["x", "Missing Count"] == 1
+    assert profile["missing_values"].loc["y", "Missing Count"] == 1
+    assert profile["stats"].loc["x", "count"] == 102
+    assert np.isclose(profile["stats"].loc["x", "mean"], (np.arange(100).sum() + 5.0) / 102)
+    assert "y" not in profile["stats"].index
+
+
+def test_update_profile_after_imputation_equals_reprofile():
+    before = _frame(2)
+    profile = profile_dataset(before, quantiles="exact", workers=1)
+
+    after = before.copy()
+    after["age"] = after["age"].fillna(after["age"].median())
+    after["region"] = after["region"].fillna("unknown")
+
+    updated = update_profile(profile, before, after, changed_columns=["age", "region"])
+    _assert_same_profile(updated, profile_dataset(after, quantiles="exact", workers=1))
+    assert updated["lineage"]["recomputed_columns"] == ["age", "region"]
+
+
+def test_update_profile_after_dropping_rows_equals_reprofile():
+    before = _frame(3)
+    profile = profile_dataset(before, quantiles="exact", workers=1)
+
+    # Rows where only income is null: income keeps its state with fewer nulls
+    only_income = before["income"].isna() & before.drop(columns="income").notna().all(axis=1)
+    after = before[~only_income]
+    updated = update_profile(profile, before, after)
+    _assert_same_profile(updated, profile_dataset(after, quantiles="exact", workers=1))
+
+    # Rows where age is null: every column holding values in them is re-profiled
+    after = before.dropna(subset=["age"])
+    updated = update_profile(profile, before, after)
+    _assert_same_profile(updated, profile_dataset(after, quantiles="exact", workers=1))
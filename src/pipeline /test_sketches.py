@@ -0,0 +1,188 @@
+# src/pipeline/test_sketches.py
+#
+# Checks the mergeable sketches: chunked vs. whole, merge order, and the
+# documented error bounds. Run with: python -m pytest -q src/pipeline/test_sketches.py
+
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import itertools
+import numpy as np
+import pandas as pd
+
+from src.pipeline.sketches import MomentSketch, KLLSketch, HyperLogLog, MisraGries
+
+N = 100_000
+EPSILON = 0.01
+
+
+def _chunks(values, n_chunks: int):
+    """Positional split of an array or Series into n_chunks near-equal parts."""
+    bounds = np.linspace(0, len(values), n_chunks + 1).astype(int)
+    return [values[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _rank_error(sample: np.ndarray, value: float, q: float) -> float:
+    """Distance between q and the normalized rank range of value in sample."""
+    low = np.searchsorted(sample, value, side="left") / sample.size
+    high = np.searchsorted(sample, value, side="right") / sample.size
+    return 0.0 if low <= q <= high else min(abs(q - low), abs(q - high))
+
+
+def _moments(parts) -> MomentSketch:
+    sketch = MomentSketch()
+    for part in parts:
+        sketch.merge(part)
+    return sketch
+
+
+def test_moments_chunked_equals_whole():
+    values = np.random.default_rng(0).normal(1e6, 3.0, size=N)
+    whole = MomentSketch()
+    whole.update(values)
+    chunked = MomentSketch()
+    for chunk in _chunks(values, 7):
+        chunked.update(chunk)
+
+    for sketch in (whole, chunked):
+        assert sketch.count == N
+        assert np.isclose(sketch.mean, values.mean(), rtol=1e-12)
+        assert np.isclose(sketch.variance, values.var(ddof=1), rtol=1e-9)
+        assert sketch.min == values.min() and sketch.max == values.max()
+
+
+def test_moments_merge_order():
+    values = np.random.default_rng(1).exponential(5.0, size=N)
+    parts = []
+    for chunk in _chunks(values, 4):
+        part = MomentSketch()
+        part.update(chunk)
+        parts.append(part)
+    parts.append(MomentSketch())  # an empty partial changes nothing
+
+    results = [_moments(order) for order in itertools.permutations(parts)]
+    for sketch in results:
+        assert sketch.count == N
+        assert np.isclose(sketch.mean, values.mean(), rtol=1e-12)
+        assert np.isclose(sketch.variance, values.var(ddof=1), rtol=1e-9)
+        assert (sketch.min, sketch.max) == (values.min(), values.max())
+
+
+def test_kll_rank_error_whole_and_chunked():
+    values = np.random.default_rng(2).lognormal(0.0, 1.0, size=N)
+    exact = np.sort(values)
+    probes = np.linspace(0.01, 0.99, 99)
+
+    whole = KLLSketch.from_epsilon(EPSILON, seed=0)
+    whole.update(values)
+    chunked = KLLSketch.from_epsilon(EPSILON, seed=0)
+    for chunk in _chunks(values, 25):
+        chunked.update(chunk)
+
+    for sketch in (whole, chunked):
+        assert sketch.n == N
+        errors = [_rank_error(exact, value, q) for q, value in zip(probes, sketch.quantile(probes))]
+        assert max(errors) <= 2 * EPSILON
+
+
+def test_kll_merge_order():
+    values = np.random.default_rng(3).normal(size=N)
+    exact = np.sort(values)
+    probes = np.linspace(0.01, 0.99, 99)
+
+    def partials():
+        parts = []
+        for i, chunk in enumerate(_chunks(values, 5)):
+            part = KLLSketch.from_epsilon(EPSILON, seed=i)
+            part.update(chunk)
+            parts.append(part)
+        return parts
+
+    for order in ([0, 1, 2, 3, 4], [4, 3, 2, 1, 0], [2, 0, 4, 1, 3]):
+        parts = partials()
+        merged = parts[order[0]]
+        for i in order[1:]:
+            merged.merge(parts[i])
+        assert merged.n == N
+        errors = [_rank_error(exact, value, q) for q, value in zip(probes, merged.quantile(probes))]
+        assert max(errors) <= 2 * EPSILON
+
+
+def test_kll_empty():
+    sketch = KLLSketch.from_epsilon(EPSILON)
+    assert np.isnan(sketch.quantile(0.5))
+    assert np.isnan(sketch.quantile([0.25, 0.75])).all()
+
+
+def _hashes(values) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def test_hll_error_bound():
+    hll = HyperLogLog(14)
+    standard_error = 1.04 / np.sqrt(hll.m)
+    for distinct in (100, 5_000, 200_000):
+        hll = HyperLogLog(14)
+        hll.update_hashes(_hashes([f"value_{i}" for i in range(distinct)]))
+        assert abs(hll.count() - distinct) / distinct <= 4 * standard_error
+
+
+def test_hll_chunked_and_merge_order_are_exact():
+    values = np.array([f"id_{i % 60_000}" for i in range(N)])
+    whole = HyperLogLog(14)
+    whole.update_hashes(_hashes(values))
+
+    parts = []
+    for chunk in _chunks(values, 4):
+        part = HyperLogLog(14)
+        part.update_hashes(_hashes(chunk))
+        parts.append(part)
+    for order in itertools.permutations(range(4)):
+        merged = HyperLogLog(14)
+        for i in order:
+            merged.merge(parts[i])
+        # Registers are per-hash maxima, so any split and order gives the same sketch
+        assert np.array_equal(merged.registers, whole.registers)
+        assert merged.count() == whole.count()
+
+
+def test_misra_gries_exact_under_capacity():
+    values = pd.Series(np.random.default_rng(4).choice([f"c{i}" for i in range(40)], size=N))
+    truth = values.value_counts()
+
+    summary = MisraGries(64)
+    for chunk in _chunks(values, 9):
+        summary.update_counts(chunk.value_counts(sort=False))
+
+    assert summary.exact and summary.n == N
+    assert summary.top().sort_index().equals(truth.sort_index())
+
+
+def test_misra_gries_error_bound_and_merge_order():
+    # Zipf-like: a few heavy values and a long tail beyond the capacity
+    rng = np.random.default_rng(5)
+    values = pd.Series(rng.zipf(1.3, size=N) % 5_000)
+    truth = values.value_counts()
+    capacity = 64
+
+    parts = []
+    for chunk in _chunks(values, 6):
+        part = MisraGries(capacity)
+        part.update_counts(chunk.value_counts(sort=False))
+        parts.append(part)
+
+    for order in ([0, 1, 2, 3, 4, 5], [5, 4, 3, 2, 1, 0], [3, 0, 5, 1, 4, 2]):
+        merged = MisraGries(capacity)
+        for i in order:
+            merged.merge(parts[i])
+        assert merged.n == N
+        assert merged.error <= N / (capacity + 1)
+
+        reported = merged.top()
+        assert len(reported) <= capacity
+        # Every count undercounts by at most error ...
+        for value, count in reported.items():
+            assert truth[value] - merged.error <= count <= truth[value]
+        # ... so every value heavier than error is reported
+        for value in truth[truth > merged.error].index:
+            assert value in reported.index
@@ -0,0 +1,155 @@
+# src/tools/chart_aggregation.py
+
+import numpy as np
+import pandas as pd
+from matplotlib.colors import LogNorm
+
+# Above this many rows scatter plots are drawn as binned density and
+# boxplots from precomputed statistics
+AGGREGATE_MIN_ROWS = 50_000
+AGG_ROW_CHUNK = 1_000_000
+HIST_BINS = 30
+DENSITY_BINS = 200
+KDE_SAMPLE_ROWS = 20_000
+KDE_GRID_POINTS = 256
+KDE_BLOCK_ROWS = 4_096
+BOX_MAX_FLIERS = 2_000
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype="float64")
+    return values[np.isfinite(values)]
+
+
+def _value_range(series: pd.Series):
+    low, high = series.min(), series.max()
+    if pd.isna(low) or pd.isna(high):
+        return None
+    low, high = float(low), float(high)
+    if not (np.isfinite(low) and np.isfinite(high)):
+        finite = _finite(series.to_numpy(dtype="float64", na_value=np.nan))
+        if finite.size == 0:
+            return None
+        low, high = float(finite.min()), float(finite.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+
+def histogram_counts(series: pd.Series, bins: int = HIST_BINS):
+    """
+    Bin counts of a numeric column, accumulated over row chunks against
+    fixed edges so the full column is never copied to float64 at once.
+    Returns (counts, edges); both empty when the column has no values.
+    """
+    value_range = _value_range(series)
+    if value_range is None:
+        return np.zeros(0, dtype="int64"), np.zeros(0)
+
+    edges = np.linspace(value_range[0], value_range[1], bins + 1)
+    counts = np.zeros(bins, dtype="int64")
+    for start in range(0, len(series), AGG_ROW_CHUNK):
+        chunk = series.iloc[start:start + AGG_ROW_CHUNK].to_numpy(dtype="float64", na_value=np.nan)
+        counts += np.histogram(_finite(chunk), bins=edges)[0]
+    return counts, edges
+
+
+def kde_curve(series: pd.Series, edges: np.ndarray, total: int = None,
+              sample_rows: int = KDE_SAMPLE_ROWS, seed: int = 0):
+    """
+    Gaussian KDE (Scott's bandwidth) fitted on a uniform sample of the
+    column and evaluated on a fixed grid over the histogram range, scaled
+    to the histogram's counts so it can be drawn on the same axis.
+    Returns (grid, curve) or None when there is too little data.
+    """
+    sample = series.sample(n=sample_rows, random_state=seed) if len(series) > sample_rows else series
+    values = _finite(sample.to_numpy(dtype="float64", na_value=np.nan))
+    if len(values) < 2 or len(edges) < 2:
+        return None
+
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    if not bandwidth > 0:
+        return None
+
+    grid = np.linspace(edges[0], edges[-1], KDE_GRID_POINTS)
+    density = np.zeros(KDE_GRID_POINTS)
+    # Sampled rows are processed in blocks to keep the (block x grid) kernel matrix small
+    for start in range(0, len(values), KDE_BLOCK_ROWS):
+        block = values[start:start + KDE_BLOCK_ROWS]
+        density += np.exp(-0.5 * ((grid[None, :] - block[:, None]) / bandwidth) ** 2).sum(axis=0)
+    density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+
+    total = int(series.notna().sum()) if total is None else total
+    return grid, density * total * (edges[1] - edges[0])
+
+
+def scatter_density(x: pd.Series, y: pd.Series, bins: int = DENSITY_BINS):
+    """
+    2-D histogram of two numeric columns over the rows where both are
+    present, accumulated in row chunks. Returns (counts, x_edges, y_edges),
+    or None when either column has no values.
+    """
+    x_range, y_range = _value_range(x), _value_range(y)
+    if x_range is None or y_range is None:
+        return None
+
+    x_edges = np.linspace(x_range[0], x_range[1], bins + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], bins + 1)
+    counts = np.zeros((bins, bins), dtype="int64")
+    for start in range(0, len(x), AGG_ROW_CHUNK):
+        xs = x.iloc[start:start + AGG_ROW_CHUNK].to_numpy(dtype="float64", na_value=np.nan)
+        ys = y.iloc[start:start + AGG_ROW_CHUNK].to_numpy(dtype="float64", na_value=np.nan)
+        both = np.isfinite(xs) & np.isfinite(ys)
+        counts += np.histogram2d(xs[both], ys[both], bins=[x_edges, y_edges])[0].astype("int64")
+    return counts, x_edges, y_edges
+
+
+def box_stats(series: pd.Series, max_fliers: int = BOX_MAX_FLIERS, seed: int = 0):
+    """
+    Boxplot statistics (quartiles, 1.5 IQR whiskers) for Axes.bxp, with the
+    points beyond the whiskers thinned to a sample of max_fliers that keeps
+    the extremes. Returns None when the column has no values.
+    """
+    values = series.dropna()
+    if values.empty:
+        return None
+    q1, med, q3 = values.quantile([0.25, 0.5, 0.75]).tolist()
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+    fliers = values[(values < low) | (values > high)]
+    if len(fliers) > max_fliers:
+        extremes = fliers.iloc[[int(np.argmin(fliers.to_numpy())), int(np.argmax(fliers.to_numpy()))]]
+        fliers = pd.concat([fliers.sample(n=max_fliers - 2, random_state=seed), extremes])
+    return {
+        "q1": q1, "med": med, "q3": q3,
+        "whislo": values[values >= low].min(), "whishi": values[values <= high].max(),
+        "fliers": fliers.to_numpy(dtype="float64"), "label": "",
+    }
+
+
+def plot_box(ax, stats: dict):
+    """Draws precomputed boxplot statistics horizontally."""
+    try:
+        ax.bxp([stats], orientation="horizontal", widths=0.5)
+    except TypeError:
+        # Matplotlib < 3.10
+        ax.bxp([stats], vert=False, widths=0.5)
+    ax.set_yticks([])
+
+
+def plot_histogram(ax, counts: np.ndarray, edges: np.ndarray, kde=None, color: str = None):
+    """Draws precomputed bin counts (and an optional KDE curve) as a histogram."""
+    if len(counts):
+        ax.hist(edges[:-1], bins=edges, weights=counts, color=color, edgecolor="white", linewidth=0.5)
+    if kde is not None:
+        ax.plot(kde[0], kde[1], color="C1" if color is None else color)
+    ax.set_ylabel("Count")
+
+
+def plot_density(ax, density, cmap: str = "viridis"):
+    """Draws a precomputed 2-D histogram as a log-scaled density image."""
+    counts, x_edges, y_edges = density
+    masked = np.ma.masked_equal(counts.T, 0)
+    mesh = ax.pcolormesh(x_edges, y_edges, masked, cmap=cmap,
+                         norm=LogNorm(vmin=1, vmax=max(int(counts.max()), 1)))
+    ax.figure.colorbar(mesh, ax=ax, label="Rows")
@@ -1,54 +1,154 @@
-
 # src/tools/chart_generator.py
 
 import os
+import json
+import hashlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
-from datetime import datetime
+from src.tools.utils import content_fingerprint, store_cache_file, touch
+from src.tools.downsampling import plot_downsampled_line
+from src.tools.chart_aggregation import (
+    AGGREGATE_MIN_ROWS, HIST_BINS, histogram_counts, scatter_density, plot_histogram, plot_density
+)
+from src.pipeline.profiler import column_top_values
+from src.pipeline.correlation import get_heatmap_matrix
 
 TEMP_DIR = "src/data/temp"
+BAR_TOP_K = 20
+HEATMAP_ANNOT_MAX = 12
+
+# Rendered charts are cached in TEMP_DIR under a hash of (data, spec, style)
+CHART_CACHE_MAX_BYTES = int(os.getenv("EDA_CHART_CACHE_MAX_MB", "256")) * 1024 * 1024
+# Bump when rendering changes so older images are not served
+CHART_STYLE = {"version": 3, "figsize": [8, 4], "dpi": 100}
+CHART_TYPES = ["line", "bar", "hist", "scatter", "heatmap"]
+
+_CACHE_STATS = {"hits": 0, "misses": 0}
 
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-def generate_chart(df: pd.DataFrame, col1: str, col2: str = None, chart_type: str = "line"):
+def top_value_counts(df: pd.DataFrame, col: str, profile: dict = None, k: int = BAR_TOP_K) -> pd.Series:
     """
-    Generates chart and saves into temp folder.
-    Returns the image file path.
+    Top-k value counts for a bar chart, read from the profile's heavy-hitter
+    summary when available instead of recounting the column.
     """
+    counts = column_top_values(profile, col, k)
+    if counts is None:
+        counts = df[col].value_counts().head(k)
+    return counts
+
+
+def time_column(df: pd.DataFrame):
+    """First datetime column of the frame, or None."""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return col
+    return None
 
-    plt.figure(figsize=(8, 4))
+
+def chart_cache_key(df: pd.DataFrame, col1: str, col2: str = None, chart_type: str = "line",
+                    style: dict = None, data_key: str = None) -> str:
+    """
+    Cache key of a chart: dataset identity, columns, chart type and style.
+    The dataset is identified by data_key (e.g. the cleaning plan's version
+    key) or, without one, by a hash of its full content.
+    """
+    spec = {
+        "data": data_key or content_fingerprint(df),
+        "columns": [None if col is None else str(col) for col in (col1, col2)],
+        "type": chart_type,
+        "style": style or CHART_STYLE,
+    }
+    return hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def _render_chart(df: pd.DataFrame, col1: str, col2: str, chart_type: str, profile: dict, file_path: str,
+                  data_key: str = None):
+    plt.figure(figsize=CHART_STYLE["figsize"])
 
     if chart_type == "line":
-        df[col1].plot(kind="line")
+        # Reduced to about the pixel width; against time when the frame has a datetime column
+        plot_downsampled_line(plt.gca(), df[col1], df[col2] if col2 else None)
         plt.title(f"Line Plot of {col1}")
 
     elif chart_type == "bar":
-        df[col1].value_counts().plot(kind="bar")
-        plt.title(f"Bar Chart of {col1}")
+        counts = top_value_counts(df, col1, profile)
+        if counts.empty:
+            plt.title(f"Bar Chart of {col1} (no repeated values)")
+        else:
+            counts.plot(kind="bar")
+            plt.title(f"Bar Chart of {col1}")
 
     elif chart_type == "hist":
-        df[col1].plot(kind="hist", bins=30)
+        # Bins are counted up front; matplotlib only draws the counts
+        counts, edges = histogram_counts(df[col1], HIST_BINS)
+        plot_histogram(plt.gca(), counts, edges)
+        plt.ylabel("Frequency")
         plt.title(f"Histogram of {col1}")
 
-    elif chart_type == "scatter" and col2:
-        plt.scatter(df[col1], df[col2])
+    elif chart_type == "scatter":
+        if len(df) > AGGREGATE_MIN_ROWS:
+            density = scatter_density(df[col1], df[col2])
+            if density is not None:
+                plot_density(plt.gca(), density)
+        else:
+            plt.scatter(df[col1], df[col2])
         plt.xlabel(col1)
         plt.ylabel(col2)
         plt.title(f"Scatter Plot: {col1} vs {col2}")
 
     elif chart_type == "heatmap":
-        corr = df.corr()
-        sns.heatmap(corr, annot=True, cmap="coolwarm")
+        corr = get_heatmap_matrix(df, data_key=data_key)
+        sns.heatmap(corr, annot=len(corr) <= HEATMAP_ANNOT_MAX, cmap="coolwarm")
         plt.title("Correlation Heatmap")
 
-    else:
-        return None
-
-    filename = f"chart_{chart_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    file_path = os.path.join(TEMP_DIR, filename)
     plt.tight_layout()
-    plt.savefig(file_path)
+    plt.savefig(file_path, format="png", dpi=CHART_STYLE["dpi"])
     plt.close()
 
+
+def generate_chart(df: pd.DataFrame, col1: str, col2: str = None, chart_type: str = "line",
+                   profile: dict = None, data_key: str = None):
+    """
+    Generates chart and saves into temp folder.
+    Pass the profile of df to let bar charts reuse its top-k summaries.
+    Line charts are downsampled to about the chart's pixel width (resampled
+    by time when the frame has a datetime column).
+    Charts are cached by (dataset identity, columns, type, style): a
+    repeated request returns the stored image without re-rendering. Pass
+    data_key when a cleaning-plan version identifies df. The
+    folder is kept under CHART_CACHE_MAX_BYTES, least recently used first.
+    Returns the image file path.
+    """
+    if chart_type not in CHART_TYPES or (chart_type == "scatter" and not col2):
+        return None
+
+    if chart_type == "line":
+        col2 = time_column(df)
+    elif chart_type != "scatter":
+        col2 = None
+
+    # The heatmap covers the whole frame, whatever column the request named
+    key_col1 = None if chart_type == "heatmap" else col1
+    key = chart_cache_key(df, key_col1, col2, chart_type, data_key=data_key)
+    file_path = os.path.join(TEMP_DIR, f"chart_{chart_type}_{key}.png")
+    if os.path.exists(file_path):
+        touch(file_path)
+        _CACHE_STATS["hits"] += 1
+        return file_path
+
+    _CACHE_STATS["misses"] += 1
+    # Unique temp name, then an atomic rename: concurrent requests never clobber each other
+    store_cache_file(
+        file_path,
+        lambda tmp_path: _render_chart(df, col1, col2, chart_type, profile, tmp_path, data_key),
+        CHART_CACHE_MAX_BYTES, suffix=".png",
+    )
     return file_path
+
+
+def chart_cache_stats() -> dict:
+    """Hit/miss counters of the chart cache in this process."""
+    total = _CACHE_STATS["hits"] + _CACHE_STATS["misses"]
+    return {**_CACHE_STATS, "hit_rate": _CACHE_STATS["hits"] / total if total else 0.0}
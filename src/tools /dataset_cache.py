@@ -0,0 +1,76 @@
+# src/tools/dataset_cache.py
+
+import os
+import hashlib
+import pyarrow as pa
+import pandas as pd
+
+from src.tools.utils import store_cache_file, touch
+
+DATASET_CACHE_DIR = "src/data/cache/datasets"
+DATASET_CACHE_MAX_BYTES = int(os.getenv("EDA_DATASET_CACHE_MAX_MB", "2048")) * 1024 * 1024
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+
+
+def content_hash(uploaded_file) -> str:
+    """
+    Hashes the uploaded bytes in blocks (BLAKE2b) without copying the file.
+    Leaves the file position at the start.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    uploaded_file.seek(0)
+    while True:
+        block = uploaded_file.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(DATASET_CACHE_DIR, f"{key}.arrow")
+
+
+def load_cached_dataset(key: str):
+    """
+    Returns the cached DataFrame for a content hash, memory-mapping the
+    Arrow IPC file instead of re-parsing the upload. None on a miss.
+    """
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+    except (OSError, pa.ArrowException):
+        # Truncated or foreign file: drop it and fall back to parsing
+        os.remove(path)
+        return None
+
+    touch(path)
+    return df
+
+
+def store_cached_dataset(key: str, df: pd.DataFrame) -> bool:
+    """
+    Writes a columnar Arrow IPC copy of the frame and evicts least recently
+    used entries beyond DATASET_CACHE_MAX_BYTES. Returns False when the frame
+    cannot be represented in Arrow (e.g. mixed-type object columns).
+    """
+    def write(tmp_path):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    try:
+        # Atomic publish so concurrent sessions never read a partial file
+        store_cache_file(_cache_path(key), write, DATASET_CACHE_MAX_BYTES, suffix=".arrow")
+    except (OSError, pa.ArrowException):
+        return False
+    return True
@@ -0,0 +1,158 @@
+# src/tools/downsampling.py
+
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+# About two points per horizontal pixel of an 8in x 100dpi chart
+LINE_MAX_POINTS = 1_600
+DOWNSAMPLE_METHOD = os.getenv("EDA_DOWNSAMPLE_METHOD", "lttb")
+# Min-max buckets are scanned this many rows at a time
+MINMAX_BLOCK_ROWS = 1_000_000
+
+
+def _positions(x, start: int, end: int) -> np.ndarray:
+    return np.arange(start, end, dtype="float64") if x is None else x[start:end]
+
+
+def lttb(y: np.ndarray, n_out: int = LINE_MAX_POINTS, x: np.ndarray = None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks, per bucket, the point forming the
+    largest triangle with the previous pick and the next bucket's average.
+    Keeps the visual shape (peaks included) of a series with n_out points.
+    x defaults to row positions; missing y values are skipped.
+    Returns the selected row positions, ascending.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    first = int(np.argmax(~np.isnan(y)))
+    selected = [first]
+    prev_x, prev_y = float(_positions(x, first, first + 1)[0]), float(y[first])
+
+    with warnings.catch_warnings():
+        # Buckets without any value are skipped
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for i in range(len(edges) - 1):
+            start, end = edges[i], edges[i + 1]
+            next_end = edges[i + 2] if i + 2 < len(edges) else n
+            next_x = np.nanmean(_positions(x, end, next_end))
+            next_y = np.nanmean(y[end:next_end])
+            if np.isnan(next_y):
+                next_x, next_y = prev_x, prev_y
+
+            bucket_x = _positions(x, start, end)
+            bucket_y = y[start:end]
+            area = np.abs((prev_x - next_x) * (bucket_y - prev_y) - (prev_x - bucket_x) * (next_y - prev_y))
+            if np.isnan(area).all():
+                continue
+            pick = start + int(np.nanargmax(area))
+            selected.append(pick)
+            prev_x, prev_y = float(_positions(x, pick, pick + 1)[0]), float(y[pick])
+
+    last = n - 1 - int(np.argmax(~np.isnan(y[::-1])))
+    if last > selected[-1]:
+        selected.append(last)
+    return np.asarray(selected, dtype="int64")
+
+
+def minmax_buckets(y: np.ndarray, n_out: int = LINE_MAX_POINTS) -> np.ndarray:
+    """
+    Min-max bucketing: splits the series into n_out / 2 equal buckets and
+    keeps each bucket's minimum and maximum, so no spike is lost. Fully
+    vectorized, scanning MINMAX_BLOCK_ROWS rows at a time.
+    Returns the selected row positions, ascending.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+
+    n_buckets = max(1, n_out // 2)
+    size = -(-n // n_buckets)
+    buckets_per_block = max(1, MINMAX_BLOCK_ROWS // size)
+    selected = []
+    for block_start in range(0, n, size * buckets_per_block):
+        block = np.asarray(y[block_start:block_start + size * buckets_per_block], dtype="float64")
+        full = len(block) // size * size
+        parts = [block[:full].reshape(-1, size)] if full else []
+        if full < len(block):
+            tail = np.full(size, np.nan)
+            tail[:len(block) - full] = block[full:]
+            parts.append(tail[None, :])
+        grid = np.vstack(parts)
+
+        valid = ~np.isnan(grid).all(axis=1)
+        low = np.argmin(np.where(np.isnan(grid), np.inf, grid), axis=1)
+        high = np.argmax(np.where(np.isnan(grid), -np.inf, grid), axis=1)
+        offsets = block_start + np.arange(len(grid)) * size
+        selected.append((offsets + low)[valid])
+        selected.append((offsets + high)[valid])
+
+    return np.unique(np.concatenate(selected))
+
+
+def downsample(y: np.ndarray, n_out: int = LINE_MAX_POINTS, x: np.ndarray = None,
+               method: str = DOWNSAMPLE_METHOD) -> np.ndarray:
+    """Row positions to plot for a series: LTTB (default) or min-max buckets."""
+    if method == "minmax":
+        return minmax_buckets(y, n_out)
+    return lttb(y, n_out, x)
+
+
+def resample_by_time(times: pd.Series, values: pd.Series, n_out: int = LINE_MAX_POINTS // 2) -> pd.DataFrame:
+    """
+    Time-based resampling: equal-width time bins sized so the span holds
+    about n_out of them, aggregated in one groupby to mean, min and max
+    (the min/max band shows the spread hidden by the mean).
+    Returns a frame indexed by bin start time; rows need not be sorted.
+    """
+    frame = pd.DataFrame({"time": pd.to_datetime(times).to_numpy(), "value": values.to_numpy()}).dropna()
+    if frame.empty:
+        return pd.DataFrame(columns=["mean", "min", "max"])
+
+    start, end = frame["time"].min(), frame["time"].max()
+    width = max((end - start) / n_out, pd.Timedelta(1, "ns"))
+    bins = ((frame["time"] - start) // width).astype("int64")
+    summary = frame.groupby(bins, sort=True)["value"].agg(["mean", "min", "max"])
+    summary.index = start + summary.index * width
+    return summary
+
+
+def downsampled_line_data(series: pd.Series, times: pd.Series = None, n_out: int = LINE_MAX_POINTS) -> dict:
+    """
+    The arrays a line chart of series needs, at most about n_out points:
+    resampled by time (mean plus min/max band) when a time column is given,
+    otherwise LTTB / min-max picks over row order.
+    """
+    if times is not None:
+        if len(series) > n_out:
+            summary = resample_by_time(times, series, n_out // 2)
+            return {"x": summary.index.to_numpy(), "y": summary["mean"].to_numpy(),
+                    "low": summary["min"].to_numpy(), "high": summary["max"].to_numpy(), "time": True}
+        order = np.argsort(pd.to_datetime(times).to_numpy(), kind="stable")
+        return {"x": times.to_numpy()[order], "y": series.to_numpy()[order], "time": True}
+
+    # Float columns are used as stored (no float64 copy of a long series)
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == "f":
+        y = series.to_numpy()
+    else:
+        y = series.to_numpy(dtype="float64", na_value=np.nan)
+    picks = downsample(y, n_out)
+    return {"x": series.index[picks].to_numpy(), "y": y[picks], "time": False}
+
+
+def plot_line_data(ax, data: dict):
+    """Draws the output of downsampled_line_data."""
+    if "low" in data:
+        ax.fill_between(data["x"], data["low"], data["high"], alpha=0.25, linewidth=0)
+    ax.plot(data["x"], data["y"])
+    if data["time"]:
+        ax.figure.autofmt_xdate()
+
+
+def plot_downsampled_line(ax, series: pd.Series, times: pd.Series = None, n_out: int = LINE_MAX_POINTS):
+    """Draws a line chart of series reduced to about n_out points."""
+    plot_line_data(ax, downsampled_line_data(series, times, n_out))
@@ -0,0 +1,92 @@
+# src/tools/exporter.py
+
+import os
+import gzip
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import pandas as pd
+
+from src.tools.utils import content_fingerprint, store_cache_file, touch
+
+EXPORT_DIR = "exports/cleaned"
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_MAX_BYTES = int(os.getenv("EDA_EXPORT_MAX_MB", "2048")) * 1024 * 1024
+PARQUET_COMPRESSION = "zstd"
+CSV_COMPRESS_LEVEL = 6
+
+# Format -> (file suffix, download mime type)
+EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+}
+
+
+def export_path(df: pd.DataFrame, fmt: str, directory: str = EXPORT_DIR, data_key: str = None) -> str:
+    """
+    Content-addressed export file name: the same frame and format map to the
+    same file. data_key identifies the frame (e.g. the cleaning plan's
+    version key); without it the full content is hashed.
+    """
+    suffix, _ = EXPORT_FORMATS[fmt]
+    return os.path.join(directory, f"cleaned_{data_key or content_fingerprint(df)}{suffix}")
+
+
+def find_export(df: pd.DataFrame, fmt: str, directory: str = EXPORT_DIR, data_key: str = None):
+    """Path of an already built export of df, or None."""
+    path = export_path(df, fmt, directory, data_key)
+    return path if os.path.exists(path) else None
+
+
+def _write_parquet(df: pd.DataFrame, path: str, chunk_rows: int):
+    # Inferred from the whole frame: an empty object column would come out as
+    # Arrow null, and a chunk starting with missing values could narrow a type
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _write_csv_gz(df: pd.DataFrame, path: str, chunk_rows: int):
+    """Arrow's CSV writer into a gzip stream; pandas to_csv for frames Arrow cannot represent."""
+    try:
+        schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+        with pa.CompressedOutputStream(path, "gzip") as sink, pacsv.CSVWriter(sink, schema) as writer:
+            for start in range(0, len(df), chunk_rows):
+                chunk = df.iloc[start:start + chunk_rows]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        return
+    except (pa.ArrowException, TypeError, ValueError):
+        # Mixed-type object columns
+        pass
+
+    with gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=CSV_COMPRESS_LEVEL) as f:
+        if df.empty:
+            df.to_csv(f, index=False)
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(f, index=False, header=start == 0)
+
+
+def export_dataset(df: pd.DataFrame, fmt: str = "parquet", directory: str = EXPORT_DIR,
+                   chunk_rows: int = EXPORT_CHUNK_ROWS, data_key: str = None) -> str:
+    """
+    Streams the frame chunk by chunk into a compressed file (zstd Parquet or
+    gzip CSV), so only one chunk is ever encoded in memory. Exports are
+    content-addressed and reused; least recently used ones are evicted
+    beyond EXPORT_MAX_BYTES. Returns the file path.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    suffix, _ = EXPORT_FORMATS[fmt]
+    os.makedirs(directory, exist_ok=True)
+    path = export_path(df, fmt, directory, data_key)
+    if os.path.exists(path):
+        touch(path)
+        return path
+
+    # Atomic publish so a concurrent download never serves a partial file
+    writer = _write_parquet if fmt == "parquet" else _write_csv_gz
+    store_cache_file(path, lambda tmp_path: writer(df, tmp_path, chunk_rows), EXPORT_MAX_BYTES, suffix)
+    return path
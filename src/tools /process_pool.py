@@ -0,0 +1,39 @@
+# src/tools/process_pool.py
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# (subsystem, workers) -> pool; pools live for the whole server process
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_process_pool(name: str, workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool of one subsystem ("profile", "impute", "report") at a given
+    size, created once under a lock and reused across calls and sessions.
+    Each subsystem and size has its own pool, so no caller ever shuts down a
+    pool another thread is still submitting to. spawn keeps workers safe
+    under Streamlit's threads.
+    """
+    key = (name, workers)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOLS[key] = pool
+    return pool
+
+
+def reset_process_pool(name: str, workers: int, pool: ProcessPoolExecutor):
+    """
+    Drops a pool that raised BrokenProcessPool (a worker died, e.g. out of
+    memory) so the next get_process_pool call spawns a fresh one. A pool
+    another thread already replaced is left alone.
+    """
+    key = (name, workers)
+    with _POOLS_LOCK:
+        if _POOLS.get(key) is pool:
+            del _POOLS[key]
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,365 @@
 # src/tools/utils.py
 
+import os
+import time
+import hashlib
+import threading
+import tracemalloc
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-def load_dataset(uploaded_file):
+# Streaming loader settings
+CHUNK_SIZE = 100_000
+SAMPLE_ROWS = 10_000
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_UNIQUE = 1_000
+
+# Fingerprint sampling: evenly spaced rows plus the head and tail blocks
+FINGERPRINT_SAMPLE_ROWS = 1_024
+FINGERPRINT_EDGE_ROWS = 64
+
+
+def _is_numeric_text(values: pd.Series) -> bool:
+    """True when every non-null string in the sample parses as a number."""
+    non_null = values.dropna()
+    if non_null.empty:
+        return False
+    return pd.to_numeric(non_null, errors="coerce").notna().all()
+
+
+def infer_compact_dtypes(sample: pd.DataFrame) -> dict:
+    """
+    Infers a compact read plan from a leading sample of the file.
+    Returns a mapping column -> one of "integer", "float", "numeric_text",
+    "category" or None (keep as parsed).
+    """
+    plan = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            plan[col] = None
+        elif pd.api.types.is_integer_dtype(series):
+            plan[col] = "integer"
+        elif pd.api.types.is_float_dtype(series):
+            plan[col] = "float"
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if _is_numeric_text(series):
+                plan[col] = "numeric_text"
+            else:
+                n_unique = series.nunique(dropna=True)
+                n_rows = max(series.notna().sum(), 1)
+                if n_unique <= CATEGORY_MAX_UNIQUE and n_unique / n_rows <= CATEGORY_MAX_RATIO:
+                    plan[col] = "category"
+                else:
+                    plan[col] = None
+        else:
+            plan[col] = None
+    return plan
+
+
+def _to_numeric_lossless(values: pd.Series):
+    """
+    Numeric version of a column, or None when some non-null value does not
+    parse (the plan comes from a sample, so later rows may hold text).
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.isna().sum() > values.isna().sum():
+        return None
+    return numbers
+
+
+def compact_frame(df: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    """
+    Applies a dtype plan to a frame (or chunk), downcasting numbers and
+    converting low-cardinality strings to categories. Numeric columns
+    holding values that do not parse are left as read.
+    """
+    for col, kind in plan.items():
+        if col not in df.columns or kind is None:
+            continue
+        if kind in ("integer", "float", "numeric_text"):
+            values = _to_numeric_lossless(df[col])
+            if values is None:
+                continue
+            if pd.api.types.is_integer_dtype(values):
+                df[col] = pd.to_numeric(values, downcast="integer")
+            else:
+                df[col] = pd.to_numeric(values, downcast="float")
+        elif kind == "category":
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _concat_chunks(chunks: list, plan: dict) -> pd.DataFrame:
+    """Concatenates compacted chunks, merging per-chunk categories."""
+    if len(chunks) == 1:
+        return chunks[0]
+
+    cat_cols = [col for col, kind in plan.items() if kind == "category"]
+    merged_cats = {
+        col: union_categoricals([chunk[col] for chunk in chunks])
+        for col in cat_cols
+    }
+
+    for chunk in chunks:
+        for col in cat_cols:
+            chunk.drop(columns=col, inplace=True)
+
+    df = pd.concat(chunks, ignore_index=True)
+    chunks.clear()
+
+    for col in cat_cols:
+        df[col] = pd.Categorical(merged_cats[col])
+
+    return df[list(plan.keys())]
+
+
+def _mixed_numeric_columns(chunks: list, plan: dict) -> list:
+    """Sampled-numeric columns that some chunk had to keep as text."""
+    return [
+        col for col, kind in plan.items()
+        if kind in ("integer", "float", "numeric_text")
+        and not all(pd.api.types.is_numeric_dtype(chunk[col]) for chunk in chunks)
+    ]
+
+
+def _read_text_columns(source, columns: list, chunksize: int) -> pd.DataFrame:
+    """
+    Re-reads columns as their raw text. Numeric chunks were parsed (1 became
+    1.0 next to blanks), so their text cannot be recovered from the frame.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    parts = list(pd.read_csv(source, usecols=columns, dtype=str, chunksize=chunksize))
+    return pd.concat(parts, ignore_index=True)
+
+
+def read_csv_streaming(source, chunksize: int = CHUNK_SIZE, sample_rows: int = SAMPLE_ROWS,
+                       track_memory: bool = False):
+    """
+    Reads a CSV in chunks with compact dtypes inferred from a leading sample.
+    Each raw chunk is compacted before the next one is parsed, so the full
+    text-typed frame is never held in memory. A column the sample showed as
+    numeric but some later chunk holds text in is re-read as text, as a
+    plain read_csv would give it.
+
+    Returns:
+        (DataFrame, load stats dict with rows, seconds, rows_per_sec and
+        peak_memory_mb when track_memory=True)
+    """
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    try:
+        sample = pd.read_csv(source, nrows=sample_rows)
+        plan = infer_compact_dtypes(sample)
+        del sample
+
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+        read_dtypes = {col: "category" for col, kind in plan.items() if kind == "category"}
+
+        chunks = []
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=read_dtypes):
+            chunks.append(compact_frame(chunk, plan))
+
+        text_cols = _mixed_numeric_columns(chunks, plan) if len(chunks) > 1 else []
+        df = _concat_chunks(chunks, plan) if chunks else pd.DataFrame(columns=list(plan))
+        if text_cols:
+            text = _read_text_columns(source, text_cols, chunksize)
+            for col in text_cols:
+                df[col] = text[col]
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "path": "streaming",
+            "rows": len(df),
+            "seconds": elapsed,
+            "rows_per_sec": len(df) / elapsed if elapsed > 0 else float("inf"),
+            "memory_mb": df.memory_usage(deep=True).sum() / 1024 / 1024,
+        }
+        if track_memory:
+            stats["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+
+    return df, stats
+
+
+def benchmark_load(path: str, chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Compares the plain pd.read_csv path with the streaming loader.
+    Returns one row of stats per path (rows/sec, peak and resident memory).
+    """
+    results = []
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        df = pd.read_csv(path)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "path": "read_csv",
+            "rows": len(df),
+            "seconds": elapsed,
+            "rows_per_sec": len(df) / elapsed if elapsed > 0 else float("inf"),
+            "memory_mb": df.memory_usage(deep=True).sum() / 1024 / 1024,
+            "peak_memory_mb": tracemalloc.get_traced_memory()[1] / 1024 / 1024,
+        })
+    finally:
+        tracemalloc.stop()
+    del df
+
+    _, stats = read_csv_streaming(path, chunksize=chunksize, track_memory=True)
+    results.append(stats)
+
+    return pd.DataFrame(results).set_index("path")
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Cheap content fingerprint of a frame: shape, column names and dtypes,
+    plus row hashes of a fixed sample (head, tail and evenly spaced rows).
+    Costs O(sample x columns) regardless of row count. Edits confined to
+    unsampled rows are not detected; use it as a cache key for frames that
+    are replaced rather than edited in place.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(df.shape).encode())
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+
+    n = len(df)
+    if n:
+        positions = np.unique(np.concatenate([
+            np.arange(min(n, FINGERPRINT_EDGE_ROWS)),
+            np.arange(max(0, n - FINGERPRINT_EDGE_ROWS), n),
+            np.linspace(0, n - 1, min(n, FINGERPRINT_SAMPLE_ROWS)).astype("int64"),
+        ]))
+        sample = df.iloc[positions]
+        try:
+            hashes = pd.util.hash_pandas_object(sample, index=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts): hash their text form instead
+            hashes = pd.util.hash_pandas_object(sample.astype(str), index=True)
+        digest.update(hashes.to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def content_fingerprint(df: pd.DataFrame, chunk_rows: int = CHUNK_SIZE) -> str:
+    """
+    Full content hash of a frame: like dataframe_fingerprint, but over every
+    row (hashed chunk_rows at a time), so any edit changes it. Costs a pass
+    over the data; use it for keys of derived artifacts (exports, reports)
+    when no cleaning-plan version identifies the frame.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(df.shape).encode())
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        try:
+            hashes = pd.util.hash_pandas_object(chunk, index=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts): hash their text form instead
+            hashes = pd.util.hash_pandas_object(chunk.astype(str), index=True)
+        digest.update(hashes.to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def touch(path: str):
+    """Marks a cache file as recently used."""
+    os.utime(path, None)
+
+
+def enforce_cache_limit(directory: str, max_bytes: int, suffix: str = "") -> int:
+    """
+    Evicts the least recently used files (oldest mtime first) in a cache
+    directory until its total size is within max_bytes.
+    Returns the number of bytes freed.
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Already evicted by another session
+            pass
+        total -= size
+        freed += size
+
+    return freed
+
+
+def atomic_write(path: str, write):
+    """
+    Publishes a file atomically: write(tmp_path) fills a temp file unique to
+    this process and thread, which then replaces path, so concurrent sessions
+    never read a partial file. The temp file is removed if write fails.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def store_cache_file(path: str, write, max_bytes: int, suffix: str = ""):
+    """
+    atomic_write into a cache directory, then evicts its least recently used
+    files ending in suffix beyond max_bytes. The new file is the most recent
+    one, so it is kept even when it alone exceeds max_bytes.
+    """
+    atomic_write(path, write)
+    enforce_cache_limit(os.path.dirname(path) or ".", max(max_bytes, os.path.getsize(path)), suffix=suffix)
+
+
+def _parse_dataset(uploaded_file) -> pd.DataFrame:
+    if uploaded_file.name.endswith(".csv"):
+        df, _ = read_csv_streaming(uploaded_file)
+        return df
+    elif uploaded_file.name.endswith(".xlsx") or uploaded_file.name.endswith(".xls"):
+        df = pd.read_excel(uploaded_file)
+        return compact_frame(df, infer_compact_dtypes(df.head(SAMPLE_ROWS)))
+    else:
+        raise ValueError("Unsupported file format")
+
+
+def load_dataset(uploaded_file, use_cache: bool = True):
     """
     Loads CSV or Excel into a Pandas DataFrame.
+    CSV files are streamed in chunks with compact dtypes. Parsed uploads are
+    cached as Arrow files keyed by content hash, so reruns and other sessions
+    uploading the same bytes memory-map the cached copy instead.
     """
+    from src.tools.dataset_cache import content_hash, load_cached_dataset, store_cached_dataset
+
     try:
-        if uploaded_file.name.endswith(".csv"):
-            return pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(".xlsx") or uploaded_file.name.endswith(".xls"):
-            return pd.read_excel(uploaded_file)
-        else:
-            raise ValueError("Unsupported file format")
+        if not use_cache:
+            return _parse_dataset(uploaded_file)
+
+        key = content_hash(uploaded_file)
+        df = load_cached_dataset(key)
+        if df is None:
+            df = _parse_dataset(uploaded_file)
+            store_cached_dataset(key, df)
+        return df
     except Exception as e:
         raise e
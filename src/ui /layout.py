@@ -1,9 +1,22 @@
 
 import streamlit as st
+import os
 import re
-from src.tools.utils import load_dataset
-from src.pipeline.profiler import profile_dataset
-from src.agents.response_generator import handle_user_query
+import time
+import pandas as pd
+from src.tools.utils import load_dataset, dataframe_fingerprint
+from src.tools.exporter import export_dataset, find_export, EXPORT_FORMATS
+from src.pipeline.profile_cache import cached_profile_dataset, profile_cache_stats
+from src.pipeline.cleaning_plan import CleaningPlan
+from src.pipeline.report_jobs import submit_report, get_report_job, cancel_report_job
+from src.pipeline.pdf_report import report_cache_stats
+from src.agents.llm_cache import llm_cache_stats
+from src.agents.response_generator import handle_user_query, session_profile, session_data_key
+
+STRATEGY_OPTIONS = ["Median", "Mean", "Most Frequent", "Drop",
+                    "Median by Group", "Mode by Group", "Forward Fill by Group"]
+# Seconds between status refreshes of a running report job
+REPORT_POLL_SECONDS = 1.0
 
 
 def markdown_to_html(text):
@@ -25,6 +38,64 @@ def markdown_to_html(text):
     return text
 
 
+def sync_cleaned_dataset(plan):
+    """Points the cleaned dataset and profile at the plan's current version"""
+    st.session_state["cleaned_dataset"] = plan.materialize()
+    st.session_state["cleaned_profile"] = plan.materialize_profile()
+
+
+def render_report_job(job_id, active):
+    """Progress, cancel and download controls of a background report job"""
+    job = get_report_job(job_id)
+    if job is None:
+        return
+    if active and job.finished:
+        # Full rerun to stop polling and show the final state
+        st.rerun()
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if job.state in ("queued", "running"):
+            label = "Waiting for a free report worker..." if job.state == "queued" else f"🔄 Building report: {job.stage}"
+            st.progress(job.progress, text=label)
+            if st.button("✖️ Cancel", key=f"cancel_report_{job.id}", use_container_width=True):
+                cancel_report_job(job.id)
+                st.rerun()
+        elif job.state == "done" and not os.path.exists(job.path):
+            st.warning("⚠️ This report was evicted from the report cache. Please generate it again.")
+        elif job.state == "done":
+            st.success("✨ Report generated successfully!")
+            with open(job.path, "rb") as f:
+                st.download_button(
+                    label="📥 Download PDF Report",
+                    data=f,
+                    file_name="EDA_Report.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            cache_stats = report_cache_stats()
+            llm_stats = llm_cache_stats()
+            st.caption(
+                f"Report cache: {cache_stats['hits']} hits, "
+                f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate) · "
+                f"LLM cache: {llm_stats['exact_hits'] + llm_stats['normalized_hits']} hits, "
+                f"{llm_stats['misses']} misses, {llm_stats['seconds_saved']:.1f}s saved"
+            )
+            if job.breakdown:
+                with st.expander("📦 Report size breakdown"):
+                    st.dataframe(
+                        pd.DataFrame(
+                            [(section, round(size / 1024, 1), note) for section, size, note in job.breakdown],
+                            columns=["Section", "Size (KB)", "Contents"],
+                        ),
+                        hide_index=True, use_container_width=True,
+                    )
+        elif job.state == "cancelled":
+            st.info("Report generation cancelled.")
+        else:
+            st.error(f"❌ Report generation failed: {job.error}")
+
+
 def inject_custom_css():
     """Inject custom CSS for stunning UI"""
     st.markdown("""
@@ -425,9 +496,15 @@ def render_main_layout():
 
                 # Run profiling
                 with st.spinner("🔬 Analyzing your data..."):
-                    profile = profile_dataset(df)
+                    profile = cached_profile_dataset(df)
                     st.session_state["profile_result"] = profile
 
+                cache_stats = profile_cache_stats()
+                st.caption(
+                    f"Profile cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+                    f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)"
+                )
+
                 st.markdown("<br>", unsafe_allow_html=True)
 
                 # Profiling Results in Expandable Sections
@@ -448,6 +525,12 @@ def render_main_layout():
                     else:
                         st.info("ℹ️ No numeric columns found for statistical analysis.")
 
+                with st.expander("🏷️ Categorical Summary", expanded=False):
+                    if not profile["categorical"].empty:
+                        st.dataframe(profile["categorical"], use_container_width=True)
+                    else:
+                        st.info("ℹ️ No categorical columns found.")
+
             except Exception as e:
                 st.error(f"❌ Error loading file: {str(e)}")
         else:
@@ -476,6 +559,28 @@ def render_main_layout():
             st.error("Profile data not found. Please reload the dataset in Tab 1.")
             st.stop()
 
+        # Cleaning is a recorded plan over the raw frame; saved checkpoints are only restored on request
+        plan = st.session_state.get("cleaning_plan")
+        if plan is None or plan.fingerprint != dataframe_fingerprint(df):
+            plan = CleaningPlan(df, profile)
+            st.session_state["cleaning_plan"] = plan
+
+        if not plan.operations:
+            checkpoint = CleaningPlan.find_checkpoint(df, exclude=plan.checkpoint_id)
+            if checkpoint is not None:
+                saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(checkpoint)))
+                col_note, col_restore = st.columns([3, 1])
+                with col_note:
+                    st.info(f"💾 Saved cleaning steps for this dataset were found (saved {saved_at}).")
+                with col_restore:
+                    if st.button("Restore saved steps", use_container_width=True):
+                        restored = CleaningPlan.load_checkpoint(df, profile, path=checkpoint)
+                        if restored is not None:
+                            plan = restored
+                            st.session_state["cleaning_plan"] = plan
+                            sync_cleaned_dataset(plan)
+                            st.rerun()
+
         missing_df = profile["missing_values"]
         missing_cols = missing_df[missing_df["Missing Count"] > 0].index.tolist()
 
@@ -490,8 +595,9 @@ def render_main_layout():
             """, unsafe_allow_html=True)
             
             # Store as cleaned even if no cleaning needed
-            if "cleaned_dataset" not in st.session_state:
+            if st.session_state.get("cleaned_dataset") is None:
                 st.session_state["cleaned_dataset"] = df
+                st.session_state["cleaned_profile"] = profile
             
             st.markdown("<br>", unsafe_allow_html=True)
             st.info("💡 Move to the next tab to chat with the AI agent!")
@@ -517,8 +623,8 @@ def render_main_layout():
         st.markdown("<br>", unsafe_allow_html=True)
 
         # Imputation Strategy Selection
-        from src.pipeline.cleaner import suggest_imputation, apply_imputation
-        suggestions = suggest_imputation(df)
+        from src.pipeline.cleaner import suggest_imputation, model_imputation_metrics, GROUP_METHODS, MODEL_METHODS
+        suggestions = suggest_imputation(df, profile)
 
         st.markdown('<div class="section-header">🧠 AI-Suggested Fixes</div>', unsafe_allow_html=True)
         st.info("💡 Our AI recommends the best imputation method for each column. You can customize below.")
@@ -539,13 +645,39 @@ def render_main_layout():
                     with col:
                         with st.container():
                             st.markdown(f"**🔹 {col_name}**")
-                            user_strategies[col_name] = st.selectbox(
+                            # Model-based fills only apply to numeric columns
+                            options = STRATEGY_OPTIONS
+                            if pd.api.types.is_numeric_dtype(df[col_name]):
+                                options = STRATEGY_OPTIONS + MODEL_METHODS
+                            method = st.selectbox(
                                 f"Strategy for {col_name}",
-                                ["Median", "Mean", "Most Frequent", "Drop"],
-                                index=["Median", "Mean", "Most Frequent", "Drop"].index(default),
+                                options,
+                                index=options.index(default),
                                 key=f"strategy_{col_name}",
                                 label_visibility="collapsed"
                             )
+                            user_strategies[col_name] = method
+
+                            # Group strategies need the grouping (and, for forward fill, the time order)
+                            if method in GROUP_METHODS:
+                                other_cols = [c for c in df.columns if c != col_name]
+                                spec = {
+                                    "method": method,
+                                    "group_by": st.multiselect(
+                                        f"Group {col_name} by",
+                                        other_cols,
+                                        default=other_cols[:1],
+                                        key=f"group_by_{col_name}"
+                                    ),
+                                }
+                                if method == "Forward Fill by Group":
+                                    spec["order_by"] = st.selectbox(
+                                        f"Order {col_name} by",
+                                        [None] + other_cols,
+                                        format_func=lambda c: "Row order" if c is None else c,
+                                        key=f"order_by_{col_name}"
+                                    )
+                                user_strategies[col_name] = spec if spec["group_by"] else default
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -554,29 +686,73 @@ def render_main_layout():
         with col2:
             if st.button("🚀 Apply Cleaning Strategy", use_container_width=True):
                 with st.spinner("🔄 Cleaning your data..."):
-                    cleaned_df = apply_imputation(df, user_strategies)
-                    st.session_state["cleaned_dataset"] = cleaned_df
+                    plan.apply(user_strategies)
+                    sync_cleaned_dataset(plan)
+                    plan.save_checkpoint()
+                    cleaned_df = st.session_state["cleaned_dataset"]
 
                 st.success("✨ Data cleaned successfully!")
                 # st.balloons()
 
+                model_metrics = model_imputation_metrics(plan.model_metrics)
+                if any(strategy in MODEL_METHODS for strategy in user_strategies.values()) and not model_metrics.empty:
+                    st.caption("Model-based imputation: wall time per column and peak memory of the process that ran it")
+                    st.dataframe(model_metrics, use_container_width=True, hide_index=True)
+
                 st.markdown("<br>", unsafe_allow_html=True)
                 st.markdown('<div class="section-header">✅ Cleaned Data Preview</div>', unsafe_allow_html=True)
                 st.dataframe(cleaned_df.head(10), use_container_width=True, height=400)
 
-                # Download cleaned data
-                st.markdown("<br>", unsafe_allow_html=True)
-                csv_data = cleaned_df.to_csv(index=False).encode("utf-8")
-                
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    st.download_button(
-                        label="⬇️ Download Cleaned Dataset",
-                        data=csv_data,
-                        file_name="cleaned_dataset.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
+        # Undo / Redo move the plan cursor; no frames are copied
+        if plan.operations:
+            st.caption(f"Cleaning steps applied: {plan.cursor} of {len(plan.operations)}")
+            col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+            with col2:
+                if st.button("↩️ Undo", use_container_width=True, disabled=not plan.can_undo()):
+                    plan.undo()
+                    sync_cleaned_dataset(plan)
+                    plan.save_checkpoint()
+                    st.rerun()
+            with col3:
+                if st.button("↪️ Redo", use_container_width=True, disabled=not plan.can_redo()):
+                    plan.redo()
+                    sync_cleaned_dataset(plan)
+                    plan.save_checkpoint()
+                    st.rerun()
+
+        # Export: the file is streamed to disk only on request, then served from there
+        if plan.cursor:
+            cleaned_df = st.session_state["cleaned_dataset"]
+            # Keyed by the plan version: the sampled fingerprint can miss what cleaning changed
+            export_key = plan.version_key()
+            st.markdown("<br>", unsafe_allow_html=True)
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                export_format = st.radio(
+                    "Export format",
+                    list(EXPORT_FORMATS),
+                    format_func=lambda fmt: {"parquet": "Parquet (zstd)", "csv.gz": "CSV (gzip)"}[fmt],
+                    horizontal=True,
+                    key="export_format"
+                )
+                export_file = find_export(cleaned_df, export_format, data_key=export_key)
+                if export_file is None and st.button("📦 Prepare Cleaned Dataset", use_container_width=True):
+                    with st.spinner("🔄 Writing export file..."):
+                        try:
+                            export_file = export_dataset(cleaned_df, export_format, data_key=export_key)
+                        except Exception as e:
+                            st.error(f"❌ Export failed: {str(e)}")
+
+                if export_file is not None:
+                    suffix, mime = EXPORT_FORMATS[export_format]
+                    with open(export_file, "rb") as f:
+                        st.download_button(
+                            label="⬇️ Download Cleaned Dataset",
+                            data=f,
+                            file_name=f"cleaned_dataset{suffix}",
+                            mime=mime,
+                            use_container_width=True
+                        )
 
     # ==================== TAB 3: Chat with EDA Agent ====================
     with tabs[2]:
@@ -671,7 +847,11 @@ def render_main_layout():
                     elif chat["role"] == "chart":
                         col1, col2, col3 = st.columns([1, 3, 1])
                         with col2:
-                            st.image(chat["message"], use_container_width=True)
+                            # Old charts may have been evicted from the chart cache
+                            if os.path.exists(chat["message"]):
+                                st.image(chat["message"], use_container_width=True)
+                            else:
+                                st.caption("Chart no longer cached; ask again to redraw it.")
 
             # Clear Chat Button
             st.markdown("<br>", unsafe_allow_html=True)
@@ -708,10 +888,11 @@ def render_main_layout():
             st.warning("⚠️ Please complete previous steps first!")
             st.stop()
 
-        from src.agents.llm_client import get_llm
-        from src.pipeline.pdf_report import generate_pdf_report
+        from src.agents.llm_cache import get_cached_llm
+        from src.agents.prompt_builder import build_report_prompt
 
         df = st.session_state["cleaned_dataset"]
+        cleaned_profile = session_profile(df)
         
         st.markdown("""
         <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; 
@@ -740,7 +921,11 @@ def render_main_layout():
             st.markdown("### 📈 Quick Stats:")
             st.metric("Total Records", f"{df.shape[0]:,}")
             st.metric("Total Features", f"{df.shape[1]}")
-            st.metric("Data Quality", f"{((1 - df.isnull().sum().sum() / (df.shape[0] * df.shape[1])) * 100):.1f}%")
+            if cleaned_profile is not None:
+                total_missing = cleaned_profile["missing_values"]["Missing Count"].sum()
+            else:
+                total_missing = df.isnull().sum().sum()
+            st.metric("Data Quality", f"{((1 - total_missing / (df.shape[0] * df.shape[1])) * 100):.1f}%")
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -748,31 +933,15 @@ def render_main_layout():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🎨 Generate PDF Report", use_container_width=True):
-                with st.spinner("🔄 Creating your professional report..."):
-                    llm = get_llm()
-
-                    prompt = (
-                        "Provide 4-6 key insights about this dataset:\n"
-                        f"Columns: {list(df.columns)}\n"
-                        f"Missing Values: {df.isnull().sum().to_dict()}\n"
-                        f"Statistics: {df.describe().to_string()}"
-                    )
-                    
-                    insights = llm.invoke(prompt).content
-                    pdf_path = generate_pdf_report(df, insights)
-
-                st.success("✨ Report generated successfully!")
-                # st.balloons()
-
-                st.markdown("<br>", unsafe_allow_html=True)
-
-                with open(pdf_path, "rb") as f:
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    with col2:
-                        st.download_button(
-                            label="📥 Download PDF Report",
-                            data=f,
-                            file_name="EDA_Report.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                # Token-budgeted summary of the profile instead of raw stats / missing dicts
+                prompt = build_report_prompt(df, cleaned_profile)
+
+                # Built in the background; identical in-flight requests share one job, each session holds its own ticket
+                job = submit_report(df, prompt, get_cached_llm(dataframe_fingerprint(df)), profile=cleaned_profile,
+                                    data_key=session_data_key(df))
+                st.session_state["report_job"] = job.id
+
+        job = get_report_job(st.session_state.get("report_job"))
+        if job is not None:
+            active = not job.finished
+            st.fragment(run_every=REPORT_POLL_SECONDS if active else None)(render_report_job)(job.id, active)